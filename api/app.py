@@ -1,10 +1,10 @@
-from flask import Flask, request, jsonify, make_response
+from quart import Quart, request, jsonify, g
 import os
-from openai import OpenAI
 from dotenv import load_dotenv
-from flask_cors import CORS
-from datetime import datetime, timedelta
+from quart_cors import cors
 import sys
+import json
+import time
 import pytz
 
 # Add the parent directory to Python path so we can import the models
@@ -12,140 +12,180 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(parent_dir)
 
 from models.base import Database
-from models.todo import Todo, TaskState
+from models.tracing import slow_query_log_from_env
+from models.todo import Todo
+from models.llm_cache import LLMCache
+from models.digest import DailyDigest
+from models.repository import run_in_db, shutdown_executor
+from services.llm import acomplete, astream
+from services.providers import provider_from_env
+from services import metrics
+from services.watchdog import watchdog_from_env
+from services import summary
 
 load_dotenv()
 
 # Initialize database with the correct path
-db_path = os.path.join(parent_dir, "nosy_bot.db")
+db_path = os.getenv('DB_PATH', os.path.join(parent_dir, "nosy_bot.db"))
 print(f"Using database at: {db_path}")
 db = Database(db_path)
 
-# Update Todo class to use our database instance
+# Log statements slower than SLOW_QUERY_MS with their query plans
+slow_query_log = slow_query_log_from_env()
+if slow_query_log:
+    db.add_query_hook(slow_query_log)
+
+# Point the models at our database instance
 Todo.db = db
+LLMCache.db = db
+LLMCache.create_table()
+DailyDigest.db = db
+DailyDigest.create_table()
+
+# Time every model method for /metrics
+metrics.instrument_models(Todo, LLMCache, DailyDigest)
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+app = Quart(__name__)
+# CORS for every route, including preflight OPTIONS requests
+app = cors(app, allow_origin='*', allow_headers=['Content-Type'], allow_methods=['GET', 'POST', 'OPTIONS'])
 
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Model backend (LLM_PROVIDER); its calls are async, so waiting on the model never blocks the server
+llm = provider_from_env()
 TIMEZONE = pytz.timezone('Asia/Bangkok')  # UTC+7
+SUMMARY_TOKEN_BUDGET = int(os.getenv('SUMMARY_TOKEN_BUDGET', summary.TOKEN_BUDGET))
+SUMMARY_MODEL_CONCURRENCY = int(os.getenv('SUMMARY_MODEL_CONCURRENCY', summary.MODEL_CONCURRENCY))
+
+# Reports routes that block the event loop for more than LOOP_STALL_MS
+loop_watchdog = watchdog_from_env()
+
+def event_stream(deltas):
+    """Server-Sent Events response: one {"delta"} event per chunk, then "done" or "error"."""
+    async def events():
+        try:
+            async for delta in deltas:
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return events(), 200, {'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'}
+
+@app.before_request
+async def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+async def record_latency(response):
+    """Observe request latency per endpoint; streamed responses count until their headers are sent."""
+    if 'request_start' in g:
+        metrics.API_SECONDS.labels(request.endpoint or 'unmatched', str(response.status_code)).observe(
+            time.perf_counter() - g.request_start)
+    return response
+
+@app.before_serving
+async def startup():
+    if loop_watchdog is not None:
+        loop_watchdog.start()
+
+@app.after_serving
+async def shutdown():
+    """Close the model backend and release the database threads."""
+    if loop_watchdog is not None:
+        await loop_watchdog.stop()
+    await llm.close()
+    shutdown_executor()
 
 # Add a simple GET endpoint
-@app.route('/api/test', methods=['GET', 'OPTIONS'])
-def test():
-    response = make_response(jsonify({
+@app.route('/api/test', methods=['GET'])
+async def test():
+    return jsonify({
         'message': 'API is working!',
         'status': 'success'
-    }))
-    # Add CORS header
-    response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Methods', 'GET, OPTIONS')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
-    return response
+    })
 
-@app.route('/api/chat', methods=['POST', 'OPTIONS'])
-def chat():
-    # Handle preflight request
-    if request.method == 'OPTIONS':
-        response = make_response()
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
-        response.headers.add('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        return response
+@app.route('/metrics', methods=['GET'])
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return body, 200, {'Content-Type': content_type}
 
+@app.route('/api/llm_cache/stats', methods=['GET'])
+async def llm_cache_stats():
+    return jsonify(await run_in_db(LLMCache.stats))
+
+@app.route('/api/chat', methods=['POST'])
+async def chat():
     try:
-        data = request.get_json(force=True)
+        data = await request.get_json(force=True)
         prompt = data.get('prompt')
-        
+
         if not prompt:
-            response = make_response(jsonify({'error': 'No prompt provided'}), 400)
-            response.headers.add('Access-Control-Allow-Origin', '*')
-            return response
-        
-        llm_response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        response = make_response(jsonify({
-            'response': llm_response.choices[0].message.content
-        }))
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        return response
-        
+            return jsonify({'error': 'No prompt provided'}), 400
+
+        messages = [
+            {"role": "user", "content": prompt}
+        ]
+        # Pass "no_cache": true to always ask the model
+        use_cache = not data.get('no_cache', False)
+
+        # Pass "stream": true to get the reply as Server-Sent Events
+        if data.get('stream'):
+            return event_stream(astream(llm, messages, use_cache=use_cache))
+
+        llm_response = await acomplete(llm, messages, use_cache=use_cache)
+
+        return jsonify({
+            'response': llm_response
+        })
+
     except Exception as e:
-        error_response = make_response(jsonify({'error': str(e)}), 500)
-        error_response.headers.add('Access-Control-Allow-Origin', '*')
-        return error_response
+        return jsonify({'error': str(e)}), 500
 
-@app.route('/api/summarize_done', methods=['POST', 'OPTIONS'])
-def summarize_done():
+@app.route('/api/summarize_done', methods=['POST'])
+async def summarize_done():
     try:
-        data = request.get_json(force=True)
+        data = await request.get_json(force=True)
         user_id = data.get('user_id')
         days = data.get('days', 7)  # Default to last 7 days if not specified
-        
+
         if not user_id:
-            response = make_response(jsonify({'error': 'No user_id provided'}), 400)
-            response.headers.add('Access-Control-Allow-Origin', '*')
-            return response
-        
-        # Calculate date range
-        end_date = datetime.now(TIMEZONE)
-        start_date = end_date - timedelta(days=days)
-        print('start_date: ', start_date)
-        print('end_date: ', end_date)
-        print('user_id: ', user_id)
-        
-        # Get completed tasks from database
-        completed_tasks = Todo.get_done_tasks(user_id)
-        print('completed_tasks: ', completed_tasks)
-        
-        if not completed_tasks:
-            response = make_response(jsonify({
-                'summary': f"No completed tasks found in the last {days} days."
-            }))
-            response.headers.add('Access-Control-Allow-Origin', '*')
-            return response
-        
-        # Format tasks for GPT
-        task_list = "\n".join([f"- {task}" for _, task, _, _ in completed_tasks])
-        
-        # Generate summary using GPT
-        llm_response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": """
-                    You are a personal assistant. 
-                    tell me a brief summary of my accomplishments based on my completed tasks. 
-                    Do not modify the tags mentioned in the tasks list. Make it short and concise.
-                    Split the summary into 2 paragraphs: professional and personal.
-                    """
-                },
-                {
-                    "role": "user", 
-                    "content": f"Here are the tasks I completed in the past {days} days:\n{task_list}"
-                }
-            ]
+            return jsonify({'error': 'No user_id provided'}), 400
+
+        result = await summary.summarize_done(
+            llm,
+            user_id,
+            days,
+            use_cache=not data.get('no_cache', False),
+            token_budget=SUMMARY_TOKEN_BUDGET,
+            concurrency=SUMMARY_MODEL_CONCURRENCY
         )
-        
-        response = make_response(jsonify({
-            'summary': llm_response.choices[0].message.content,
-            'tasks': [task for _, task, _, _ in completed_tasks],
-            'total_tasks': len(completed_tasks)
-        }))
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        return response
-        
+
+        if result['summary'] is None:
+            return jsonify({
+                'summary': f"No completed tasks found in the last {days} days."
+            })
+
+        return jsonify(result)
+
     except Exception as e:
         print('Error:', str(e))  # Add this for debugging
-        error_response = make_response(jsonify({'error': str(e)}), 500)
-        error_response.headers.add('Access-Control-Allow-Origin', '*')
-        return error_response
+        return jsonify({'error': str(e)}), 500
+
+def serve(workers: int, host: str = '127.0.0.1', port: int = 2108):
+    """Serve the API from `workers` Hypercorn worker processes."""
+    from hypercorn.config import Config
+    from hypercorn.run import run
+
+    config = Config()
+    # Hypercorn puts the directory of this path first on the workers' sys.path
+    config.application_path = os.path.join(parent_dir, 'api.app') + ':app'
+    config.bind = [f'{host}:{port}']
+    config.workers = workers
+    run(config)
 
 if __name__ == '__main__':
-    app.run(debug=True, port=2108)
\ No newline at end of file
+    port = int(os.getenv('API_PORT', '2108'))
+    workers = int(os.getenv('API_WORKERS', '0'))
+    if workers > 0:
+        serve(workers, os.getenv('API_HOST', '127.0.0.1'), port)
+    else:
+        app.run(debug=True, port=port)
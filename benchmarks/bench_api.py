@@ -0,0 +1,136 @@
+"""Load test for the API against the offline model provider.
+
+Seeds a temporary database with a week of completed tasks, then serves
+api/app.py as a subprocess with LLM_PROVIDER=offline: once on the
+single-process dev server and once with Hypercorn workers. Reports
+requests/s and latency for /api/test and /api/summarize_done, with and
+without the LLM cache. Model latency and failure rate are fixed, so runs
+are repeatable and need no network.
+
+Usage:
+    python benchmarks/bench_api.py [requests] [concurrency] [workers] [model_ms] [failure_rate]
+"""
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+# Add the parent directory to Python path so we can import the models
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from models.base import Database
+from models.todo import Todo
+from models.tag import Tag
+
+API_PORT = 2118
+USERS = 50
+
+def seed(db_path):
+    """A week of completed tasks for USERS users."""
+    db = Database(db_path)
+    Todo.db = db
+    Tag.db = db
+    Tag.create_table()
+    Todo.create_tables()
+    with db.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO tasks (user_id, task, state, created_at) VALUES (?, ?, 2, datetime('now', ?))",
+            [(user_id, f"task {i} for user {user_id} #work", f"-{i % 7} days")
+             for user_id in range(1, USERS + 1) for i in range(40)]
+        )
+    db.close()
+
+def start_api(db_path, workers, model_ms, failure_rate):
+    env = dict(
+        os.environ,
+        DB_PATH=db_path,
+        API_PORT=str(API_PORT),
+        API_WORKERS=str(workers),
+        LLM_PROVIDER='offline',
+        OFFLINE_LLM_LATENCY_MS=str(model_ms),
+        OFFLINE_LLM_FAILURE_RATE=str(failure_rate),
+    )
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(parent_dir, 'api', 'app.py')],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f'http://127.0.0.1:{API_PORT}/api/test').status_code == 200:
+                return process
+        except httpx.TransportError:
+            time.sleep(0.2)
+    stop_api(process)
+    raise RuntimeError("API did not start")
+
+def stop_api(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    process.wait()
+
+async def load(method, path, body, requests, concurrency):
+    """Send `requests` calls with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{API_PORT}', limits=limits, timeout=120) as client:
+
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.request(method, path, json=body(i) if body else None)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200 or 'error' in response.json():
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return (requests / elapsed, latencies[len(latencies) // 2] * 1000,
+            latencies[int(len(latencies) * 0.99)] * 1000, errors)
+
+SCENARIOS = (
+    ('/api/test', 'GET', '/api/test', None),
+    ('summarize (cached)', 'POST', '/api/summarize_done',
+     lambda i: {'user_id': i % USERS + 1, 'days': 7}),
+    ('summarize (no_cache)', 'POST', '/api/summarize_done',
+     lambda i: {'user_id': i % USERS + 1, 'days': 7, 'no_cache': True}),
+)
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    model_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 200
+    failure_rate = float(sys.argv[5]) if len(sys.argv) > 5 else 0.0
+
+    rows = []
+    for label, server_workers in (('dev server', 0), (f'{workers} workers', workers)):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'bench.db')
+            seed(db_path)
+            process = start_api(db_path, server_workers, model_ms, failure_rate)
+            try:
+                # Warm the digests and LLM cache so "cached" measures the cached path
+                asyncio.run(load('POST', '/api/summarize_done', SCENARIOS[1][3], USERS, concurrency))
+                for name, method, path, body in SCENARIOS:
+                    rows.append((label, name, *asyncio.run(load(method, path, body, requests, concurrency))))
+            finally:
+                stop_api(process)
+
+    print(f"\n{'server':<12} {'endpoint':<22} {'req/s':>8} {'p50 (ms)':>10} {'p99 (ms)':>10} {'errors':>7}")
+    for label, name, throughput, p50, p99, errors in rows:
+        print(f"{label:<12} {name:<22} {throughput:>8.0f} {p50:>10.1f} {p99:>10.1f} {errors:>7}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Broadcast engine against a local stand-in Bot.
+
+Compares the old one-user-at-a-time loop with services.broadcast on a fake
+Bot API that has a fixed round-trip time, injects RetryAfter flood errors
+and has some users who blocked the bot. Checks that every reachable user
+got exactly one message and that the send rate stayed under the limit.
+
+Usage:
+    python benchmarks/bench_broadcast.py [users] [rtt_ms]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+# Add the parent directory to Python path so we can import the services
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from telegram.error import Forbidden, RetryAfter
+
+from services.broadcast import Broadcaster, TokenBucket
+
+RATE = 25
+BURST = 5
+
+class Chat:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.first_name = f"user{user_id}"
+
+class FakeBot:
+    """Stand-in for telegram.Bot with latency, flood control and blocked users."""
+
+    def __init__(self, rtt, blocked=(), flood_every=0):
+        self.rtt = rtt
+        self.blocked = set(blocked)
+        self.flood_every = flood_every
+        self.calls = []
+        self.delivered = {}
+
+    async def _request(self, user_id):
+        self.calls.append(time.monotonic())
+        await asyncio.sleep(self.rtt)
+        if self.flood_every and len(self.calls) % self.flood_every == 0:
+            raise RetryAfter(1)
+        if user_id in self.blocked:
+            raise Forbidden("Forbidden: bot was blocked by the user")
+
+    async def get_chat(self, chat_id):
+        await self._request(chat_id)
+        return Chat(chat_id)
+
+    async def send_message(self, chat_id, text):
+        await self._request(chat_id)
+        self.delivered[chat_id] = self.delivered.get(chat_id, 0) + 1
+
+def peak_rate(calls):
+    """Most calls made in any one-second window."""
+    peak = 0
+    start = 0
+    for end, t in enumerate(calls):
+        while t - calls[start] >= 1.0:
+            start += 1
+        peak = max(peak, end - start + 1)
+    return peak
+
+async def sequential(bot, users):
+    """The previous job loop: one user at a time, any error aborts the rest."""
+    try:
+        for user_id in users:
+            chat = await bot.get_chat(user_id)
+            await bot.send_message(chat_id=user_id, text=f"Hi {chat.first_name}!")
+    except Exception as e:
+        print(f"  sequential loop aborted: {e}")
+
+async def concurrent(bot, users):
+    broadcaster = Broadcaster(TokenBucket(rate=RATE, capacity=BURST), concurrency=10)
+
+    async def deliver(call, user_id):
+        chat = await call(bot.get_chat, user_id)
+        await call(bot.send_message, chat_id=user_id, text=f"Hi {chat.first_name}!")
+
+    return await broadcaster.run('bench', users, deliver)
+
+def main():
+    n_users = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rtt = (int(sys.argv[2]) if len(sys.argv) > 2 else 100) / 1000
+    users = list(range(1, n_users + 1))
+    blocked = set(random.Random(0).sample(users, max(1, n_users // 50)))
+
+    print(f"{n_users} users, {rtt * 1000:.0f}ms RTT, {len(blocked)} blocked, limit {RATE} calls/s\n")
+
+    bot = FakeBot(rtt, blocked=blocked)
+    start = time.monotonic()
+    asyncio.run(sequential(bot, users))
+    print(f"sequential:  {time.monotonic() - start:6.1f}s, {len(bot.delivered)} delivered")
+
+    bot = FakeBot(rtt, blocked=blocked, flood_every=97)
+    start = time.monotonic()
+    stats = asyncio.run(concurrent(bot, users))
+    elapsed = time.monotonic() - start
+    print(f"broadcaster: {elapsed:6.1f}s, {len(bot.delivered)} delivered, peak {peak_rate(bot.calls)} calls/s")
+    print(f"  {stats}")
+
+    reachable = set(users) - blocked
+    assert set(bot.delivered) == reachable, "every reachable user should get a message"
+    assert all(count == 1 for count in bot.delivered.values()), "no user should get duplicates"
+    assert stats.failed == len(blocked)
+    assert peak_rate(bot.calls) <= RATE + BURST, "refill plus one burst should bound the rate"
+    print("\n✅ all reachable users delivered exactly once within the rate limit")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Per-operation latency of the model layer with and without connection pooling.
+
+Usage:
+    python benchmarks/bench_connection_pool.py [iterations]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+# Add the parent directory to Python path so we can import the models
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from models.base import Database
+from models.todo import Todo, TaskState
+from models.tag import Tag
+
+class UnpooledDatabase(Database):
+    """The previous behaviour: a fresh connection per call, default journal mode."""
+
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_file)
+        try:
+            yield conn
+        finally:
+            conn.commit()
+            conn.close()
+
+    def transaction(self):
+        return self.get_connection()
+
+def time_op(fn, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def run(db_class, iterations):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = db_class(os.path.join(tmp, "bench.db"))
+        Todo.db = db
+        Tag.db = db
+        Tag.create_table()
+        Todo.create_tables()
+
+        user_id = 42
+        ids = []
+        results = {
+            'Todo.create': time_op(lambda i: ids.append(Todo.create(user_id, f"task {i}")), iterations),
+            'Todo.update_state': time_op(lambda i: Todo.update_state(ids[i], user_id, TaskState.WIP), iterations),
+            'Todo.get_active_tasks_by_user': time_op(lambda i: Todo.get_active_tasks_by_user(user_id), iterations),
+            'Tag.get_tags_for_task': time_op(lambda i: Tag.get_tags_for_task(ids[i], include_source=True), iterations),
+        }
+        if hasattr(db, 'close'):
+            db.close()
+        return results
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    before = run(UnpooledDatabase, iterations)
+    after = run(Database, iterations)
+
+    print(f"\n{'operation':<32} {'before (us)':>12} {'after (us)':>12} {'speedup':>8}")
+    for op in before:
+        print(f"{op:<32} {before[op]:>12.1f} {after[op]:>12.1f} {before[op] / after[op]:>7.1f}x")
+
+if __name__ == '__main__':
+    main()
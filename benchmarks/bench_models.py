@@ -0,0 +1,176 @@
+"""Model-layer latency and throughput as the database grows.
+
+Builds synthetic databases (see gen_dataset.py) at each requested size and
+times the Todo and Tag calls the bot makes, for users drawn from the same
+Zipf activity model, so heavy users show up as often as they do in real
+traffic. Results are compared with benchmarks/baseline_models.json; a call
+whose p50 is more than REGRESSION_FACTOR slower than its baseline fails the
+run.
+
+Usage:
+    python benchmarks/bench_models.py [sizes ...] [--data-dir=DIR] [--save-baseline]
+
+Sizes are task counts, 10000 and 100000 by default; 1000000 and 10000000
+work too but take a while to generate. --data-dir keeps the generated
+databases for later runs. Each run works on a scratch copy, so the write
+benchmarks never change the dataset later runs read.
+
+Baselines are absolute timings from the machine they were saved on: run
+with --save-baseline once on each new host before comparing against it.
+"""
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add the parent directory to Python path so we can import the models
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from models.base import Database
+from models.cache import configure_active_task_cache
+from models.tag import Tag, TagSource
+from models.todo import Todo, TaskState
+
+from gen_dataset import TAGS, generate, zipf_weights
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_models.json')
+REGRESSION_FACTOR = 1.5
+# Differences below this are timer noise, whatever the ratio
+NOISE_MS = 0.05
+ITERATIONS = 300
+TIME_BUDGET = 3.0  # seconds per call
+
+def operations(db, rng):
+    """Model calls to time, each taking the iteration number."""
+    users = db.execute("SELECT COUNT(*) FROM users")[0][0]
+    max_task = db.execute("SELECT MAX(id) FROM tasks")[0][0]
+    user_ids = rng.choices(range(1, users + 1), cum_weights=zipf_weights(users), k=ITERATIONS)
+    task_ids = [rng.randint(1, max_task) for _ in range(ITERATIONS)]
+    owners = dict(db.execute(
+        f"SELECT id, user_id FROM tasks WHERE id IN ({','.join('?' * len(task_ids))})", task_ids
+    ))
+    tags = rng.choices(TAGS, cum_weights=zipf_weights(len(TAGS)), k=ITERATIONS)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    week_ago = now - timedelta(days=7)
+
+    return {
+        'Todo.create': lambda i: Todo.create(user_ids[i], "benchmark task #work"),
+        'Todo.update_state': lambda i: Todo.update_state(task_ids[i], owners.get(task_ids[i], 0), TaskState.WIP),
+        'Todo.get_active_tasks_by_user': lambda i: Todo.get_active_tasks_by_user(user_ids[i]),
+        'Todo.get_done_tasks': lambda i: Todo.get_done_tasks(user_ids[i]),
+        'Todo.get_done_tasks_page': lambda i: Todo.get_done_tasks_page(user_ids[i]),
+        'Todo.get_tasks_completed_in_range': lambda i: Todo.get_tasks_completed_in_range(user_ids[i], week_ago, now),
+        'Todo.fingerprint_done_by_day': lambda i: Todo.fingerprint_done_by_day(
+            user_ids[i], week_ago.strftime('%Y-%m-%d'), now.strftime('%Y-%m-%d')),
+        'Tag.add_tags_to_task': lambda i: Tag.add_tags_to_task(task_ids[i], ['benchmark'], TagSource.MANUAL),
+        'Tag.get_tags_for_task': lambda i: Tag.get_tags_for_task(task_ids[i], include_source=True),
+        'Tag.get_tags_for_tasks': lambda i: Tag.get_tags_for_tasks(task_ids[i:i + 10], include_source=True),
+        'Tag.get_tasks_by_tag': lambda i: Tag.get_tasks_by_tag(tags[i]),
+    }
+
+class BenchDatabase(Database):
+    def execute(self, sql, params=()):
+        with self.get_connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+def time_call(fn):
+    """Latencies (seconds) of up to ITERATIONS calls, stopping after TIME_BUDGET."""
+    latencies = []
+    deadline = time.perf_counter() + TIME_BUDGET
+    for i in range(ITERATIONS):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+        if start > deadline:
+            break
+    return latencies
+
+def copy_database(source, target):
+    """Consistent copy of a SQLite database, WAL contents included."""
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+def run(size, data_dir, scratch_dir):
+    path = os.path.join(data_dir, f'tasks_{size}.db')
+    if not os.path.exists(path):
+        print(f"Generating {size} tasks...")
+        generate(path, size)
+    scratch = os.path.join(scratch_dir, f'tasks_{size}.db')
+    copy_database(path, scratch)
+
+    db = BenchDatabase(scratch)
+    Todo.db = db
+    Tag.db = db
+    # Measure the database, not the per-user cache
+    configure_active_task_cache(enabled=False)
+
+    results = {}
+    for name, fn in operations(db, random.Random(1)).items():
+        latencies = sorted(time_call(fn))
+        results[name] = {
+            'p50_ms': round(latencies[len(latencies) // 2] * 1000, 4),
+            'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 4),
+            'ops_per_s': round(len(latencies) / sum(latencies)),
+        }
+    db.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(scratch + suffix):
+            os.remove(scratch + suffix)
+    return results
+
+def main():
+    flags = [arg for arg in sys.argv[1:] if arg.startswith('--')]
+    sizes = [int(arg) for arg in sys.argv[1:] if not arg.startswith('--')] or [10_000, 100_000]
+    save_baseline = '--save-baseline' in flags
+    data_dir = next((flag.split('=', 1)[1] for flag in flags if flag.startswith('--data-dir=')), None)
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+
+    regressions = []
+    with tempfile.TemporaryDirectory() as tmp:
+        scratch_dir = os.path.join(tmp, 'scratch')
+        os.makedirs(scratch_dir)
+        data_dir = data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        for size in sizes:
+            results = run(size, data_dir, scratch_dir)
+            base = baseline.get(str(size), {})
+            print(f"\n{size} tasks")
+            print(f"{'call':<34} {'p50 (ms)':>9} {'p99 (ms)':>9} {'ops/s':>9} {'base p50':>9} {'ratio':>7}")
+            for name, result in results.items():
+                line = f"{name:<34} {result['p50_ms']:>9.3f} {result['p99_ms']:>9.3f} {result['ops_per_s']:>9.0f}"
+                if name in base:
+                    ratio = result['p50_ms'] / base[name]['p50_ms']
+                    slower = result['p50_ms'] - base[name]['p50_ms']
+                    flag = ''
+                    if ratio > REGRESSION_FACTOR and slower > NOISE_MS:
+                        flag = ' ❌'
+                        regressions.append(f"{name} at {size} tasks")
+                    line += f" {base[name]['p50_ms']:>9.3f} {ratio:>6.2f}x{flag}"
+                print(line)
+            if save_baseline:
+                baseline[str(size)] = results
+
+    if save_baseline:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {BASELINE_PATH}")
+    elif regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Weekly summary job against the offline model provider and a stand-in Bot.
+
+Imports bot.py on a temporary database with LLM_PROVIDER=offline, seeds
+users with a week of completed tasks and runs generate_weekly_summary
+twice: cold, where every user needs a model call, and warm, where the LLM
+cache answers. Model latency, failure rate and seed are fixed, so runs are
+repeatable and need no network.
+
+Usage:
+    python benchmarks/bench_weekly_summary.py [users] [model_ms] [failure_rate]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+# Add the parent directory to Python path so we can import the bot
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+class FakeBot:
+    """Stand-in for telegram.Bot with a fixed round-trip time."""
+
+    def __init__(self, rtt):
+        self.rtt = rtt
+        self.sent = 0
+
+    async def get_chat(self, chat_id):
+        await asyncio.sleep(self.rtt)
+        return SimpleNamespace(id=chat_id, first_name=f"user{chat_id}")
+
+    async def send_message(self, chat_id, text):
+        await asyncio.sleep(self.rtt)
+        self.sent += 1
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    model_ms = sys.argv[2] if len(sys.argv) > 2 else '500'
+    failure_rate = sys.argv[3] if len(sys.argv) > 3 else '0.02'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(
+            DB_PATH=os.path.join(tmp, 'bench.db'),
+            LLM_PROVIDER='offline',
+            OFFLINE_LLM_LATENCY_MS=model_ms,
+            OFFLINE_LLM_FAILURE_RATE=failure_rate,
+        )
+        # The bot's Bot API budget is not what this measures
+        os.environ.setdefault('BROADCAST_RATE', '1000')
+        import bot
+
+        with bot.db.get_connection() as conn:
+            conn.executemany(
+                "INSERT INTO users (user_id, first_name) VALUES (?, ?)",
+                [(user_id, f"user{user_id}") for user_id in range(1, users + 1)]
+            )
+            conn.executemany(
+                "INSERT INTO tasks (user_id, task, state, created_at) VALUES (?, ?, 2, datetime('now', ?))",
+                [(user_id, f"task {i} for user {user_id} #work", f"-{i % 6} days")
+                 for user_id in range(1, users + 1) for i in range(15)]
+            )
+
+        print(f"\n{'run':<6} {'users/s':>8} {'sent':>6} {'failed':>7} {'model calls':>12} {'seconds':>8}")
+        for run in ('cold', 'warm'):
+            fake_bot = FakeBot(rtt=0.05)
+            calls = bot.llm.calls
+            start = time.perf_counter()
+            stats = asyncio.run(bot.generate_weekly_summary(SimpleNamespace(bot=fake_bot)))
+            elapsed = time.perf_counter() - start
+            print(f"{run:<6} {stats.recipients / elapsed:>8.1f} {stats.sent:>6} {stats.failed:>7} "
+                  f"{bot.llm.calls - calls:>12} {elapsed:>8.2f}")
+
+        bot.shutdown_executor()
+        bot.db.close()
+
+if __name__ == '__main__':
+    main()
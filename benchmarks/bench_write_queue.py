@@ -0,0 +1,89 @@
+"""Write throughput with per-call commits versus the group-commit WriteQueue.
+
+Simulates a burst of concurrent /todo, /did and /done messages going
+through the async repository.
+
+Usage:
+    python benchmarks/bench_write_queue.py [writes] [concurrency]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add the parent directory to Python path so we can import the models
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from models.base import Database
+from models.todo import Todo, TaskState
+from models.tag import Tag
+from models import repository
+from models.repository import AsyncTodo
+
+async def burst(writes, concurrency, open_tasks):
+    """Run `writes` mixed mutations with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            user_id = i % 100
+            start = time.perf_counter()
+            if i % 3 == 0:
+                task_id = await AsyncTodo.create(user_id, f"task {i} #work")
+            elif i % 3 == 1:
+                task_id = await AsyncTodo.create(user_id, f"did {i}", TaskState.DONE)
+            else:
+                task_id, owner = open_tasks[i % len(open_tasks)]
+                task_id = await AsyncTodo.update_state(task_id, owner, TaskState.DONE)
+            latencies.append(time.perf_counter() - start)
+            return task_id
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(1, writes + 1)))
+    elapsed = time.perf_counter() - start
+    assert all(results), "every write should report success"
+    latencies.sort()
+    return writes / elapsed, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000
+
+def run(batched, writes, concurrency):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "bench.db"), pool_size=8)
+        Todo.db = db
+        Tag.db = db
+        Tag.create_table()
+        Todo.create_tables()
+
+        # Tasks for the /done share of the burst to complete
+        open_tasks = [(Todo.create(user_id % 100, f"open {user_id}"), user_id % 100)
+                      for user_id in range(writes // 3 + 1)]
+
+        stats = None
+        if batched:
+            stats = repository.enable_write_batching()
+        try:
+            result = asyncio.run(burst(writes, concurrency, open_tasks))
+        finally:
+            repository.disable_write_batching()
+            repository.shutdown_executor()
+            db.close()
+
+        if stats:
+            print(f"  {stats.writes} writes in {stats.batches} commits")
+        return result
+
+def main():
+    writes = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    per_call = run(False, writes, concurrency)
+    batched = run(True, writes, concurrency)
+
+    print(f"\n{'mode':<18} {'writes/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for mode, (throughput, p50, p99) in (('per-call commits', per_call), ('group commit', batched)):
+        print(f"{mode:<18} {throughput:>10.0f} {p50:>10.2f} {p99:>10.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Query-plan regression check for the model layer.
+
+Calls every Todo/Tag query against a scratch database, captures the SQL
+each one executes and runs EXPLAIN QUERY PLAN on it. Exits non-zero if
+any statement falls back to a full table scan that is not explicitly
+allowed below.
+
+Usage:
+    python benchmarks/check_query_plans.py
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Add the parent directory to Python path so we can import the models
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from models.base import Database
+from models.todo import Todo, TaskState
+from models.tag import Tag, TagSource
+from models.user import User
+from models.llm_cache import LLMCache
+from models.digest import DailyDigest
+
+# Queries that are allowed to scan, with the reason why
+ALLOWED_SCANS = {
+    'Todo.get_active_tasks': 'returns active tasks across every user',
+    'Todo.get_all_users': 'DISTINCT over every user; reads the covering index only',
+}
+
+USER_ID = 42
+
+def model_queries(task_id):
+    """Model calls to check, keyed by name."""
+    now = datetime.now()
+    return {
+        'Todo.belongs_to_user': lambda: Todo.belongs_to_user(task_id, USER_ID),
+        'Todo.get_active_tasks': lambda: Todo.get_active_tasks(),
+        'Todo.update_state': lambda: Todo.update_state(task_id, USER_ID, TaskState.WIP),
+        'Todo.get_all_users': lambda: Todo.get_all_users(),
+        'Todo.get_done_tasks': lambda: Todo.get_done_tasks(USER_ID),
+        'Todo.get_done_tasks_page': lambda: Todo.get_done_tasks_page(
+            USER_ID, cursor=(now.strftime('%Y-%m-%d %H:%M:%S'), task_id)),
+        'Todo.cancel_task': lambda: Todo.cancel_task(task_id, USER_ID, 'plan check'),
+        'Todo.get_cancelled_tasks': lambda: Todo.get_cancelled_tasks(USER_ID),
+        'Todo.get_cancelled_tasks_page': lambda: Todo.get_cancelled_tasks_page(
+            USER_ID, cursor=(now.strftime('%Y-%m-%d %H:%M:%S'), task_id), newer=True),
+        'Todo.get_tasks_completed_in_range': lambda: Todo.get_tasks_completed_in_range(
+            USER_ID, now - timedelta(days=7), now),
+        'Todo.get_active_tasks_by_user': lambda: Todo.get_active_tasks_by_user(USER_ID),
+        'Todo.get_task_tags': lambda: Todo.get_task_tags(task_id),
+        'Todo.iter_tasks_completed_in_range': lambda: list(Todo.iter_tasks_completed_in_range(
+            USER_ID, now - timedelta(days=7), now)),
+        'Todo.fingerprint_done_by_day': lambda: Todo.fingerprint_done_by_day(
+            USER_ID, (now - timedelta(days=6)).strftime('%Y-%m-%d'), now.strftime('%Y-%m-%d')),
+        'DailyDigest.get_range': lambda: DailyDigest.get_range(
+            USER_ID, (now - timedelta(days=6)).strftime('%Y-%m-%d'), now.strftime('%Y-%m-%d')),
+        'DailyDigest.save': lambda: DailyDigest.save(USER_ID, now.strftime('%Y-%m-%d'), 'plan check', 1, 'plan check'),
+        'User.touch': lambda: User.touch(USER_ID, 'Plan', 'plan_check'),
+        'User.get_users_page': lambda: User.get_users_page(USER_ID - 1, opt_in='reminders_enabled', with_tasks=True),
+        'LLMCache.get': lambda: LLMCache.get(LLMCache.make_key('plan-check', [])),
+        'Tag.add_tags_to_task': lambda: Tag.add_tags_to_task(task_id, ['check'], TagSource.MANUAL),
+        'Tag.get_tags_for_task': lambda: Tag.get_tags_for_task(task_id, include_source=True),
+        'Tag.get_tags_for_tasks': lambda: Tag.get_tags_for_tasks([task_id, task_id + 1], include_source=True),
+        'Tag.get_tasks_by_tag': lambda: Tag.get_tasks_by_tag('work'),
+    }
+
+class TracingDatabase(Database):
+    """Database that records every statement its connections execute."""
+
+    def __init__(self, *args, **kwargs):
+        self.statements = []
+        super().__init__(*args, **kwargs)
+
+    def _connect(self):
+        conn = super()._connect()
+        conn.set_trace_callback(self.statements.append)
+        return conn
+
+def full_scans(conn, statement):
+    """Return the plan lines of a statement that scan a whole table."""
+    rows = conn.execute(f'EXPLAIN QUERY PLAN {statement}').fetchall()
+    details = [row[-1] for row in rows]
+    return [d for d in details if d.startswith('SCAN ') and d != 'SCAN CONSTANT ROW']
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        db = TracingDatabase(os.path.join(tmp, 'plans.db'))
+        Todo.db = db
+        Tag.db = db
+        User.db = db
+        LLMCache.db = db
+        DailyDigest.db = db
+        Tag.create_table()
+        Todo.create_tables()
+        User.create_table()
+        LLMCache.create_table()
+        DailyDigest.create_table()
+
+        task_id = Todo.create(USER_ID, 'write report #work')
+        Todo.create(USER_ID, 'ship release #work', TaskState.DONE)
+
+        with db.get_connection() as conn:
+            for name, query in model_queries(task_id).items():
+                db.statements.clear()
+                query()
+                statements = [s for s in db.statements
+                              if s.lstrip().split(None, 1)[0].upper() in ('SELECT', 'UPDATE', 'DELETE')]
+                scans = [scan for s in statements for scan in full_scans(conn, s)]
+
+                if not scans:
+                    print(f"✅ {name}")
+                elif name in ALLOWED_SCANS:
+                    print(f"👌 {name}: {'; '.join(scans)} (allowed: {ALLOWED_SCANS[name]})")
+                else:
+                    failures += 1
+                    print(f"❌ {name}: {'; '.join(scans)}")
+
+        db.close()
+
+    if failures:
+        print(f"\n{failures} quer{'y' if failures == 1 else 'ies'} regressed to a full scan")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
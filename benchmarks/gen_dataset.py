@@ -0,0 +1,130 @@
+"""Generate a synthetic nosy_bot.db for benchmarks.
+
+User activity follows a Zipf distribution: a few heavy users own most of
+the tasks and most users only have a handful. Tasks are spread over the
+past year, with open tasks concentrated in the last two weeks, and about
+60% carry one to three hashtags drawn from a Zipf-weighted vocabulary.
+
+Usage:
+    python benchmarks/gen_dataset.py <tasks> <out.db> [users] [seed]
+"""
+import itertools
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add the parent directory to Python path so we can import the models
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+from models.base import Database
+from models.digest import DailyDigest
+from models.llm_cache import LLMCache
+from models.tag import Tag
+from models.todo import Todo, TaskState
+from models.user import User
+
+ZIPF_EXPONENT = 1.1
+DAYS = 365
+BATCH = 50_000
+
+TAGS = [
+    'work', 'personal', 'health', 'family', 'finance', 'learning', 'meeting', 'urgent', 'home', 'errand',
+    'reading', 'writing', 'code', 'review', 'design', 'travel', 'fitness', 'shopping', 'admin', 'email',
+    'call', 'planning', 'research', 'ops', 'bug', 'release', 'docs', 'hiring', 'support', 'sales',
+]
+VERBS = ['write', 'review', 'fix', 'plan', 'call', 'buy', 'read', 'ship', 'clean', 'prepare', 'update', 'book']
+NOUNS = ['report', 'slides', 'budget', 'groceries', 'release notes', 'invoice', 'PR', 'roadmap', 'flight',
+         'dentist', 'newsletter', 'backlog']
+
+# (state, weight) for tasks from the last two weeks and for older ones
+RECENT_STATES = ((TaskState.TODO, 35), (TaskState.WIP, 10), (TaskState.DONE, 50), (TaskState.CANCELLED, 5))
+OLD_STATES = ((TaskState.TODO, 3), (TaskState.WIP, 1), (TaskState.DONE, 88), (TaskState.CANCELLED, 8))
+
+def zipf_weights(n):
+    return list(itertools.accumulate(1 / rank ** ZIPF_EXPONENT for rank in range(1, n + 1)))
+
+def default_users(tasks):
+    return max(100, tasks // 100)
+
+def generate(path, tasks, users=None, seed=0):
+    """Write a database with `tasks` tasks to path; returns the number of users."""
+    users = users or default_users(tasks)
+    rng = random.Random(seed)
+    user_weights = zipf_weights(users)
+    tag_weights = zipf_weights(len(TAGS))
+    recent_states, recent_weights = zip(*RECENT_STATES)
+    old_states, old_weights = zip(*OLD_STATES)
+    now = datetime.now(timezone.utc)
+
+    db = Database(path)
+    for model in (Todo, Tag, User, LLMCache, DailyDigest):
+        model.db = db
+    Tag.create_table()
+    Todo.create_tables()
+    User.create_table()
+    LLMCache.create_table()
+    DailyDigest.create_table()
+    db.close()
+
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.executemany(
+        "INSERT INTO users (user_id, first_name, last_seen) VALUES (?, ?, ?)",
+        [(user_id, f"user{user_id}", now.strftime('%Y-%m-%d %H:%M:%S')) for user_id in range(1, users + 1)]
+    )
+
+    task_id = 0
+    for start in range(0, tasks, BATCH):
+        task_rows, tag_rows = [], []
+        owners = rng.choices(range(1, users + 1), cum_weights=user_weights, k=min(BATCH, tasks - start))
+        for user_id in owners:
+            task_id += 1
+            # Most activity is recent
+            age = min(DAYS, rng.expovariate(1 / 60))
+            created_at = now - timedelta(days=age, seconds=rng.randrange(86400))
+            if age < 14:
+                state = rng.choices(recent_states, recent_weights)[0]
+            else:
+                state = rng.choices(old_states, old_weights)[0]
+            tags = []
+            if rng.random() < 0.6:
+                tags = list(dict.fromkeys(rng.choices(TAGS, cum_weights=tag_weights, k=rng.randint(1, 3))))
+            text = f"{rng.choice(VERBS)} {rng.choice(NOUNS)}" + "".join(f" #{tag}" for tag in tags)
+            task_rows.append((
+                task_id, user_id, text, int(state), created_at.strftime('%Y-%m-%d %H:%M:%S'),
+                'photo' if rng.random() < 0.05 else None,
+                'no longer needed' if state == TaskState.CANCELLED else None,
+            ))
+            for tag in tags:
+                tag_rows.append((task_id, tag, 'manual' if rng.random() < 0.2 else 'extracted'))
+
+        with conn:
+            conn.executemany(
+                "INSERT INTO tasks (id, user_id, task, state, created_at, image_file_id, cancel_reason) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                task_rows
+            )
+            conn.executemany("INSERT INTO tags (task_id, tag, source) VALUES (?, ?, ?)", tag_rows)
+
+    conn.close()
+    return users
+
+def main():
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    tasks = int(sys.argv[1])
+    path = sys.argv[2]
+    users = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    seed = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+
+    start = time.perf_counter()
+    users = generate(path, tasks, users, seed)
+    print(f"{tasks} tasks for {users} users written to {path} in {time.perf_counter() - start:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""End-to-end load harness for the bot's handler graph.
+
+Builds the same Application as bot.main() (via bot.build_application),
+pointed at a local fake Bot API server with a fixed round-trip time, on a
+temporary database with LLM_PROVIDER=offline. Synthetic Updates from many
+simulated users, with Zipf-distributed activity and a realistic command
+mix, are fed into the update queue at a fixed rate. Reports throughput and
+p50/p95/p99 latency per command, measured from injection until every
+handler group has run for the update.
+
+Settings such as CONCURRENT_UPDATES, DB_WRITE_BATCHING or
+OFFLINE_LLM_LATENCY_MS are read from the environment as usual. Event-loop
+stalls caught by the watchdog (LOOP_STALL_MS) are listed by handler.
+
+Usage:
+    python benchmarks/load_bot.py [updates] [users] [rate] [api_rtt_ms]
+"""
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qs
+
+# Add the parent directory to Python path so we can import the bot
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(parent_dir)
+
+API_PORT = 2120
+TOKEN = '123456:LOAD-TEST'
+TASKS_PER_USER = 6
+
+# (command, weight): roughly what real traffic looks like
+COMMAND_MIX = (
+    ('todo', 25),
+    ('list', 20),
+    ('did', 10),
+    ('done', 10),
+    ('focus', 5),
+    ('tag', 5),
+    ('help', 4),
+    ('done_list', 5),
+    ('page', 5),
+    ('cancelled', 3),
+    ('cancel', 3),
+    ('photo', 3),
+    ('summarize', 2),
+)
+
+class FakeBotAPI:
+    """Bot API server on a background thread that answers every method after `rtt` seconds."""
+
+    def __init__(self, rtt):
+        self.rtt = rtt
+        self.calls = {}
+        self._message_ids = itertools.count(1)
+
+    def _message(self, params):
+        chat_id = int(params.get('chat_id', 0))
+        return {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': str(params.get('text', '')),
+        }
+
+    def _result(self, method, params):
+        if method == 'getMe':
+            return {'id': 1, 'is_bot': True, 'first_name': 'Load', 'username': 'load_bot'}
+        if method in ('sendMessage', 'editMessageText', 'sendPhoto'):
+            return self._message(params)
+        if method == 'sendMediaGroup':
+            return [self._message(params) for _ in json.loads(params.get('media', '[]'))]
+        return True
+
+    @staticmethod
+    def _params(head, body):
+        if b'application/json' in head:
+            return json.loads(body or b'{}')
+        if b'application/x-www-form-urlencoded' in head:
+            return {k: v[0] for k, v in parse_qs(body.decode()).items()}
+        return {}  # multipart uploads: nothing the reply depends on
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = 0
+                for line in head.split(b'\r\n'):
+                    if line.lower().startswith(b'content-length:'):
+                        length = int(line.split(b':', 1)[1])
+                body = await reader.readexactly(length)
+                method = head.split(b' ', 2)[1].rsplit(b'/', 1)[-1].decode()
+                self.calls[method] = self.calls.get(method, 0) + 1
+                await asyncio.sleep(self.rtt)
+                payload = json.dumps({'ok': True, 'result': self._result(method, self._params(head, body))}).encode()
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                    b'Content-Length: %d\r\n\r\n' % len(payload) + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def start(self):
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(asyncio.start_server(self._handle, '127.0.0.1', API_PORT, backlog=1024))
+        threading.Thread(target=loop.run_forever, daemon=True).start()
+
+def seed(db, users):
+    """Give every user open and completed tasks.
+
+    Returns {user_id: [open task ids]} and {user_id: (created_at, id) of the newest done task}.
+    """
+    with db.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO tasks (user_id, task, state, created_at) VALUES (?, ?, ?, datetime('now', ?))",
+            [(user_id, f"task {i} for user {user_id} #work", 0 if i < TASKS_PER_USER else 2, f"-{i % 6} days")
+             for user_id in range(1, users + 1) for i in range(TASKS_PER_USER * 3)]
+        )
+        rows = conn.execute("SELECT user_id, id, state, created_at FROM tasks").fetchall()
+    open_tasks, done_keys = {}, {}
+    for user_id, task_id, state, created_at in rows:
+        if state == 0:
+            open_tasks.setdefault(user_id, []).append(task_id)
+        else:
+            done_keys[user_id] = max(done_keys.get(user_id, (created_at, task_id)), (created_at, task_id))
+    return open_tasks, done_keys
+
+class Traffic:
+    """Synthetic update payloads from Zipf-distributed users."""
+
+    def __init__(self, users, open_tasks, done_keys, seed=0):
+        self.random = random.Random(seed)
+        self.users = list(range(1, users + 1))
+        self.user_weights = list(itertools.accumulate(1 / rank ** 1.1 for rank in self.users))
+        self.commands = [c for c, _ in COMMAND_MIX]
+        self.command_weights = list(itertools.accumulate(w for _, w in COMMAND_MIX))
+        self.open_tasks = open_tasks
+        self.done_keys = done_keys
+        self.awaiting_reason = set()
+        self.ids = itertools.count(1)
+
+    def _message(self, user_id, text=None, **extra):
+        message = {
+            'message_id': next(self.ids),
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': f"user{user_id}"},
+            **extra,
+        }
+        if text is not None:
+            message['text'] = text
+            if text.startswith('/'):
+                message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}]
+        return message
+
+    def next(self):
+        """Return (command label, update dict)."""
+        user_id = self.random.choices(self.users, cum_weights=self.user_weights)[0]
+        update = {'update_id': next(self.ids)}
+
+        if user_id in self.awaiting_reason:
+            self.awaiting_reason.discard(user_id)
+            update['message'] = self._message(user_id, "not needed anymore")
+            return 'cancel reason', update
+
+        command = self.random.choices(self.commands, cum_weights=self.command_weights)[0]
+        task_id = self.random.choice(self.open_tasks[user_id])
+        if command == 'page':
+            created_at, done_id = self.done_keys[user_id]
+            update['callback_query'] = {
+                'id': str(update['update_id']),
+                'from': {'id': user_id, 'is_bot': False, 'first_name': f"user{user_id}"},
+                'chat_instance': str(user_id),
+                'data': f"page|done|older|{created_at}|{done_id}",
+                'message': self._message(user_id, "page"),
+            }
+        elif command == 'photo':
+            update['message'] = self._message(
+                user_id,
+                photo=[{'file_id': 'photo', 'file_unique_id': 'photo', 'width': 1, 'height': 1}],
+                caption="/todo review this mockup #design",
+                caption_entities=[{'type': 'bot_command', 'offset': 0, 'length': 5}],
+            )
+        else:
+            text = {
+                'todo': "/todo write the quarterly report #work",
+                'did': "/did answered support tickets #work",
+                'done': f"/done {task_id}",
+                'focus': f"/focus {task_id}",
+                'tag': f"/tag {task_id} #urgent",
+                'cancel': f"/cancel {task_id}",
+                'summarize': "/summarize 7",
+            }.get(command, f"/{command}")
+            update['message'] = self._message(user_id, text)
+            if command == 'cancel':
+                self.awaiting_reason.add(user_id)
+        return command, update
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+async def run(bot, updates, traffic, rate, api):
+    from telegram import Update
+    from telegram.ext import TypeHandler
+
+    application = bot.build_application(TOKEN, base_url=f'http://127.0.0.1:{API_PORT}/bot')
+    injected = {}
+    finished = {}
+    all_done = asyncio.Event()
+
+    async def mark_finished(update, context):
+        finished[update.update_id] = time.perf_counter()
+        if len(finished) == updates:
+            all_done.set()
+
+    # Runs after every other handler group for the update
+    application.add_handler(TypeHandler(Update, mark_finished), group=99)
+
+    await application.initialize()
+    await bot.post_init(application)
+    await application.start()
+    labels = {}
+    start = time.perf_counter()
+    for i in range(updates):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        label, payload = traffic.next()
+        update = Update.de_json(payload, application.bot)
+        labels[update.update_id] = label
+        injected[update.update_id] = time.perf_counter()
+        await application.update_queue.put(update)
+    try:
+        await asyncio.wait_for(all_done.wait(), timeout=300)
+    except asyncio.TimeoutError:
+        print(f"Timed out with {updates - len(finished)} updates unfinished")
+    elapsed = max(finished.values(), default=start) - start
+
+    await application.stop()
+    await application.shutdown()
+    await bot.post_shutdown(application)
+
+    by_command = {}
+    for update_id, done_at in finished.items():
+        by_command.setdefault(labels[update_id], []).append(done_at - injected[update_id])
+
+    print(f"\n{len(finished)} updates in {elapsed:.1f}s ({len(finished) / elapsed:.0f}/s), "
+          f"{sum(api.calls.values())} Bot API calls")
+    print(f"\n{'command':<14} {'count':>6} {'per s':>7} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10}")
+    rows = sorted(by_command.items(), key=lambda item: -len(item[1]))
+    everything = sorted(l for _, latencies in rows for l in latencies)
+    for command, latencies in rows + [('all', everything)]:
+        latencies.sort()
+        print(f"{command:<14} {len(latencies):>6} {len(latencies) / elapsed:>7.1f} "
+              f"{percentile(latencies, 0.50) * 1000:>10.1f} {percentile(latencies, 0.95) * 1000:>10.1f} "
+              f"{percentile(latencies, 0.99) * 1000:>10.1f}")
+
+    if bot.loop_watchdog is not None:
+        stalls = {}
+        for stall in bot.loop_watchdog.stalls:
+            stalls[stall.source] = stalls.get(stall.source, 0) + 1
+        print(f"\nEvent loop: max lag {bot.loop_watchdog.max_lag * 1000:.0f}ms, "
+              f"{sum(stalls.values())} stalls over {bot.loop_watchdog.threshold * 1000:.0f}ms"
+              + "".join(f"\n  {source}: {count}" for source, count in sorted(stalls.items())))
+
+def main():
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else 100
+    api_rtt_ms = float(sys.argv[4]) if len(sys.argv) > 4 else 30
+
+    api = FakeBotAPI(api_rtt_ms / 1000)
+    api.start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(DB_PATH=os.path.join(tmp, 'load.db'), LLM_PROVIDER='offline')
+        import bot
+
+        open_tasks, done_keys = seed(bot.db, users)
+        traffic = Traffic(users, open_tasks, done_keys)
+        asyncio.run(run(bot, updates, traffic, rate, api))
+        bot.db.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,34 @@
+import asyncio
 import logging
-from telegram import Update
-from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters, ConversationHandler
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import MessageLimit
+from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, TypeHandler, filters, ConversationHandler
 from models.todo import Todo, TaskState
 from models.base import Database
+from models.tracing import slow_query_log_from_env
 from enum import IntEnum
 from datetime import datetime, timedelta, time
 import os
 from dotenv import load_dotenv
 import pytz
-from openai import OpenAI
-import requests
+import httpx
 from functools import partial
+from typing import Optional
 from models.tag import Tag, TagSource
+from models.user import User
+from models.llm_cache import LLMCache
+from models.digest import DailyDigest
+from models.cache import configure_active_task_cache
+from models.repository import AsyncTodo, AsyncUser, shutdown_executor, enable_write_batching, disable_write_batching
+from services.rendering import reply_task_list, reply_photos, ProgressiveMessage
+from services.broadcast import Broadcaster, TokenBucket
+from services.llm import acomplete
+from services.providers import provider_from_env
+from services import metrics
+from services.watchdog import watchdog_from_env
+from services.profiler import SamplingProfiler
+from services.update_processor import PerUserUpdateProcessor
+from services import summary as summary_service
 
 # Load environment variables
 load_dotenv()
@@ -27,29 +44,134 @@ logger = logging.getLogger(__name__)
 
 # Initialize database with absolute path
 current_dir = os.path.dirname(os.path.abspath(__file__))
-db_path = os.path.join(current_dir, "nosy_bot.db")
+db_path = os.getenv('DB_PATH', os.path.join(current_dir, "nosy_bot.db"))
 print(f"Using database at: {db_path}")
 db = Database(db_path)
 
-# Update Todo and Tag classes to use our database instance
+# Log statements slower than SLOW_QUERY_MS with their query plans
+slow_query_log = slow_query_log_from_env()
+if slow_query_log:
+    db.add_query_hook(slow_query_log)
+
+# Point the models at our database instance
 Todo.db = db
 Tag.db = db
+User.db = db
+LLMCache.db = db
+DailyDigest.db = db
 
 # Create tables if they don't exist
 Todo.create_tables()
 Tag.create_table()
+User.create_table()
+LLMCache.create_table()
+DailyDigest.create_table()
+
+# Time every model method for the metrics endpoint
+metrics.instrument_models(Todo, Tag, User, LLMCache, DailyDigest)
+
+# Per-user active-task cache, on unless ACTIVE_TASK_CACHE=0
+configure_active_task_cache(
+    enabled=os.getenv('ACTIVE_TASK_CACHE', '1').lower() not in ('0', 'false', 'no'),
+    maxsize=int(os.getenv('ACTIVE_TASK_CACHE_SIZE', '1024'))
+)
+
+# Optionally group task writes into batched commits for bursty load
+if os.getenv('DB_WRITE_BATCHING', '').lower() in ('1', 'true', 'yes'):
+    enable_write_batching(
+        max_batch=int(os.getenv('DB_WRITE_BATCH_SIZE', '64')),
+        max_delay=float(os.getenv('DB_WRITE_BATCH_DELAY_MS', '0')) / 1000
+    )
+    logger.info("Write batching enabled")
 
 # Add states for conversation
 WAITING_FOR_CANCEL_REASON = 1
 
+# Tasks per page for /done_list and /cancelled
+TASK_PAGE_SIZE = 10
+
 # Store temporary data
 cancel_task_ids = {}
 
 # Add timezone configuration
 TIMEZONE = pytz.timezone('Asia/Bangkok')  # UTC+7
 
-# Initialize OpenAI client
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# Scheduled jobs share one Bot API rate limit (Telegram allows ~30 msg/s)
+broadcaster = Broadcaster(
+    TokenBucket(rate=float(os.getenv('BROADCAST_RATE', '25'))),
+    concurrency=int(os.getenv('BROADCAST_CONCURRENCY', '10'))
+)
+
+# Model backend (LLM_PROVIDER); its calls are async so they never block the handler loop
+llm = provider_from_env()
+
+SUMMARY_TOKEN_BUDGET = int(os.getenv('SUMMARY_TOKEN_BUDGET', summary_service.TOKEN_BUDGET))
+SUMMARY_MODEL_CONCURRENCY = int(os.getenv('SUMMARY_MODEL_CONCURRENCY', summary_service.MODEL_CONCURRENCY))
+
+# /summarize runs the summary service in-process unless SUMMARY_API_URL points
+# it at the API; that path shares one pooled HTTP client with bounded timeouts
+SUMMARY_API_URL = os.getenv('SUMMARY_API_URL')
+summary_http = httpx.AsyncClient(
+    base_url=SUMMARY_API_URL,
+    timeout=httpx.Timeout(float(os.getenv('SUMMARY_API_TIMEOUT', '120')), connect=5.0),
+    limits=httpx.Limits(max_connections=20, max_keepalive_connections=5)
+) if SUMMARY_API_URL else None
+
+# Minimum seconds between edits of a message showing a streamed reply
+STREAM_EDIT_INTERVAL = float(os.getenv('STREAM_EDIT_INTERVAL', '1.5'))
+
+async def fetch_summary(user_id: int, days: int, no_cache: bool, on_text=None) -> dict:
+    """Summarize a user's completed tasks, in-process or through the API.
+
+    on_text is awaited with the summary so far while it streams; the API
+    path returns the summary in one piece.
+    """
+    if summary_http is None:
+        return await summary_service.summarize_done(
+            llm,
+            user_id,
+            days,
+            use_cache=not no_cache,
+            token_budget=SUMMARY_TOKEN_BUDGET,
+            on_text=on_text,
+            concurrency=SUMMARY_MODEL_CONCURRENCY
+        )
+    response = await summary_http.post(
+        '/api/summarize_done',
+        json={'user_id': user_id, 'days': days, 'no_cache': no_cache}
+    )
+    return response.json()
+
+# Reports handlers and jobs that block the event loop for more than LOOP_STALL_MS
+loop_watchdog = watchdog_from_env()
+
+# Telegram user ids allowed to run admin commands such as /profile
+ADMIN_USER_IDS = {int(user_id) for user_id in os.getenv('ADMIN_USER_IDS', '').split(',') if user_id.strip()}
+
+# /profile samples every thread; it does nothing until an admin runs it
+profiler = SamplingProfiler()
+profile_lock = asyncio.Lock()  # One profile at a time
+PROFILE_MAX_SECONDS = 300
+
+# Weekly summaries make one model call per user; this bounds how many run at once
+summary_broadcaster = Broadcaster(
+    broadcaster.limiter,
+    concurrency=int(os.getenv('SUMMARY_CONCURRENCY', '5'))
+)
+
+async def track_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Keep the users table current from every incoming update."""
+    user = update.effective_user
+    if user:
+        await AsyncUser.touch(user.id, user.first_name, user.username)
+
+async def get_first_name(call, bot, user_id: int, first_name: str) -> str:
+    """Use the stored name, looking it up once for users backfilled without one."""
+    if first_name:
+        return first_name
+    user_info = await call(bot.get_chat, user_id, idempotent=True)
+    await AsyncUser.set_first_name(user_id, user_info.first_name)
+    return user_info.first_name
 
 # Command handlers
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -72,7 +194,7 @@ Available commands:
 /cancel <number> - Cancel a task
 /list - Show active tasks
 /cancelled - Show cancelled tasks
-/summarize <number_of_days> - Summarize completed tasks for the user
+/summarize <number_of_days> [fresh] - Summarize completed tasks for the user
 /tag <task_id> #tag1 #tag2 - Add tags to an existing task
     """
     await update.message.reply_text(help_text)
@@ -90,7 +212,7 @@ async def add_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     task = ' '.join(context.args)
     
-    task_id = Todo.create(user_id, task, TaskState.TODO)
+    task_id = await AsyncTodo.create(user_id, task, TaskState.TODO)
     if task_id:
         await update.message.reply_text(f"Task added: {task} (ID: {task_id})")
     else:
@@ -101,43 +223,37 @@ async def list_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         user_id = update.effective_user.id
         
-        tasks = Todo.get_active_tasks_by_user(user_id)
+        # Tasks come with (tag, source) pairs in one call, cached per user
+        tasks = await AsyncTodo.get_active_tasks_by_user(user_id, include_tag_source=True)
         print(f"Active tasks for user {user_id}: {tasks}")
         
         if not tasks:
             await update.message.reply_text("You have no active tasks! Use /todo to add one.")
             return
         
-        await update.message.reply_text("📋 Active Tasks (TODO & WIP):")
-        for task_id, task, state, image_file_id, tags in tasks:
-            try:
-                emoji = "📌" if state == "TODO" else "🚀"  # Only TODO or WIP states
-                
-                # Get tags with their sources
-                all_tags = Tag.get_tags_for_task(task_id, include_source=True)
-                extracted_tags = [tag for tag, source in all_tags if source == str(TagSource.EXTRACTED)]
-                manual_tags = [tag for tag, source in all_tags if source == str(TagSource.MANUAL)]
-                
-                # Format tags
-                
-                manual_tags_text = ' '.join([f'#{tag}' for tag in manual_tags]) if manual_tags else ''
-                
-                # Combine message parts
-                message = f"{emoji} {task_id}. {task}"
-                if manual_tags_text:
-                    message += f" {manual_tags_text}"
-                message += f" [{state}]"
-                
-                if image_file_id:
-                    await update.message.reply_photo(
-                        photo=image_file_id,
-                        caption=message
-                    )
-                else:
-                    await update.message.reply_text(message)
-            except Exception as e:
-                print(f"Error processing task {task_id}: {e}")
-                continue
+        # Text-only tasks are packed into a few messages, photo tasks into media groups
+        text_blocks = []
+        photos = []
+        for task_id, task, state, image_file_id, all_tags in tasks:
+            emoji = "📌" if state == "TODO" else "🚀"  # Only TODO or WIP states
+            
+            manual_tags = [tag for tag, source in all_tags if source == str(TagSource.MANUAL)]
+            
+            # Format tags
+            manual_tags_text = ' '.join([f'#{tag}' for tag in manual_tags]) if manual_tags else ''
+            
+            # Combine message parts
+            message = f"{emoji} {task_id}. {task}"
+            if manual_tags_text:
+                message += f" {manual_tags_text}"
+            message += f" [{state}]"
+            
+            if image_file_id:
+                photos.append((image_file_id, message))
+            else:
+                text_blocks.append(message)
+        
+        await reply_task_list(update.message, "📋 Active Tasks (TODO & WIP):", text_blocks, photos)
                 
     except Exception as e:
         print(f"Error in list_tasks: {e}")
@@ -145,27 +261,113 @@ async def list_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "Sorry, something went wrong while fetching your tasks. Please try again later."
         )
 
-async def list_done(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """List completed tasks."""
+def format_done_task(task_id, task, state, image_file_id):
+    photo = "📷 " if image_file_id else ""
+    return f"✅ {task_id}. {photo}{task}"
+
+def format_cancelled_task(task_id, task, state, image_file_id, cancel_reason):
+    photo = "📷 " if image_file_id else ""
+    return f"❌ {task_id}. {photo}{task}\nReason: {cancel_reason}"
+
+# Paged lists: kind -> (page query, header, empty message, line formatter)
+TASK_PAGES = {
+    'done': (AsyncTodo.get_done_tasks_page, "✅ Completed Tasks:",
+             "You haven't completed any tasks yet!", format_done_task),
+    'cancelled': (AsyncTodo.get_cancelled_tasks_page, "❌ Cancelled Tasks:",
+                  "You have no cancelled tasks!", format_cancelled_task),
+}
+
+def render_task_page(kind: str, tasks, older_cursor, newer_cursor, page=None):
+    """Render one page of tasks as a single message with Newer/Older buttons.
+
+    Photo tasks are listed with a 📷 marker; a Photos button sends the page's
+    photos as media groups, so turning pages doesn't repost them. page is the
+    (direction, cursor) the page was fetched with, None for the first page.
+    """
+    _, header, _, format_task = TASK_PAGES[kind]
+    text = "\n\n".join([header] + [format_task(*task) for task in tasks])
+    if len(text) > MessageLimit.MAX_TEXT_LENGTH:
+        text = text[:MessageLimit.MAX_TEXT_LENGTH - 1] + "…"
+    
+    # Callback data is page|<kind>|<direction>|<created_at>|<id>, well under 64 bytes
+    buttons = []
+    if any(task[3] for task in tasks):
+        # photos|<kind>[|<direction>|<created_at>|<id>] repeats the query that fetched this page
+        page_query = f"|{page[0]}|{page[1][0]}|{page[1][1]}" if page else ""
+        buttons.append(InlineKeyboardButton("🖼 Photos", callback_data=f"photos|{kind}{page_query}"))
+    if newer_cursor:
+        buttons.append(InlineKeyboardButton(
+            "⬅️ Newer", callback_data=f"page|{kind}|newer|{newer_cursor[0]}|{newer_cursor[1]}"
+        ))
+    if older_cursor:
+        buttons.append(InlineKeyboardButton(
+            "Older ➡️", callback_data=f"page|{kind}|older|{older_cursor[0]}|{older_cursor[1]}"
+        ))
+    return text, InlineKeyboardMarkup([buttons]) if buttons else None
+
+def page_photos(kind: str, tasks):
+    """(file_id, caption) pairs for the photo tasks on a page."""
+    format_task = TASK_PAGES[kind][3]
+    return [(task[3], format_task(*task)) for task in tasks if task[3]]
+
+async def send_task_page(update: Update, kind: str):
+    """Send the first (newest) page of a paged task list."""
+    get_page, _, empty_message, _ = TASK_PAGES[kind]
     user_id = update.effective_user.id
     
-    tasks = Todo.get_done_tasks(user_id)
+    tasks, older_cursor, newer_cursor = await get_page(user_id, TASK_PAGE_SIZE)
+    if not tasks:
+        await update.message.reply_text(empty_message)
+        return
+    
+    text, reply_markup = render_task_page(kind, tasks, older_cursor, newer_cursor)
+    await update.message.reply_text(text, reply_markup=reply_markup)
+
+async def task_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show the next or previous page when a Newer/Older button is pressed."""
+    query = update.callback_query
+    await query.answer()
+    
+    try:
+        _, kind, direction, created_at, task_id = query.data.split('|')
+        get_page = TASK_PAGES[kind][0]
+        cursor = (created_at, int(task_id))
+    except (ValueError, KeyError):
+        logger.warning(f"Ignoring malformed page callback: {query.data}")
+        return
     
+    tasks, older_cursor, newer_cursor = await get_page(
+        update.effective_user.id, TASK_PAGE_SIZE, cursor, newer=(direction == 'newer')
+    )
     if not tasks:
-        await update.message.reply_text("You haven't completed any tasks yet!")
         return
     
-    await update.message.reply_text("✅ Completed Tasks:")
-    for task_id, task, state, image_file_id in tasks:
-        message = f"✅ {task_id}. {task}"
-        
-        if image_file_id:
-            await update.message.reply_photo(
-                photo=image_file_id,
-                caption=message
-            )
+    text, reply_markup = render_task_page(kind, tasks, older_cursor, newer_cursor, (direction, cursor))
+    await query.edit_message_text(text, reply_markup=reply_markup)
+
+async def task_photos_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Send the photos of a task page when its Photos button is pressed."""
+    query = update.callback_query
+    await query.answer()
+    
+    try:
+        _, kind, *page = query.data.split('|')
+        get_page = TASK_PAGES[kind][0]
+        if page:
+            direction, created_at, task_id = page
+            cursor, newer = (created_at, int(task_id)), direction == 'newer'
         else:
-            await update.message.reply_text(message)
+            cursor, newer = None, False
+    except (ValueError, KeyError):
+        logger.warning(f"Ignoring malformed photos callback: {query.data}")
+        return
+    
+    tasks, _, _ = await get_page(update.effective_user.id, TASK_PAGE_SIZE, cursor, newer=newer)
+    await reply_photos(query.message, page_photos(kind, tasks))
+
+async def list_done(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """List completed tasks, one page at a time."""
+    await send_task_page(update, 'done')
 
 async def focus(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Mark a task as WIP."""
@@ -181,7 +383,7 @@ async def focus(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Please provide a valid task number.")
         return
     
-    if Todo.update_state(task_id, user_id, TaskState.WIP):
+    if await AsyncTodo.update_state(task_id, user_id, TaskState.WIP):
         await update.message.reply_text(f"Task {task_id} is now in progress! 🚀")
     else:
         await update.message.reply_text("Failed to update task state. Please check the task number.")
@@ -200,7 +402,7 @@ async def done_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Please provide a valid task number.")
         return
     
-    if Todo.update_state(task_id, user_id, TaskState.DONE):
+    if await AsyncTodo.update_state(task_id, user_id, TaskState.DONE):
         await update.message.reply_text(f"Task {task_id} completed! 🎉")
     else:
         await update.message.reply_text("Failed to update task state. Please check the task number.")
@@ -219,7 +421,7 @@ async def did_task(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     task = ' '.join(context.args)
     
-    if Todo.create(user_id, task, TaskState.DONE):
+    if await AsyncTodo.create(user_id, task, TaskState.DONE):
         await update.message.reply_text(f"✅ Logged completed task: {task}")
     else:
         await update.message.reply_text("Failed to log the task. Please try again.")
@@ -244,13 +446,10 @@ async def check_progress(context: ContextTypes.DEFAULT_TYPE):
         return
     
     try:
-        users = Todo.get_all_users()
-        logger.info(f"Sending reminders to {len(users)} users")
-        
-        for user_id in users:
+        async def deliver(call, recipient):
+            user_id, first_name = recipient
             # Get user's name
-            user_info = await context.bot.get_chat(user_id)
-            username = user_info.first_name
+            username = await get_first_name(call, context.bot, user_id, first_name)
             
             message = (
                 f"Hey {username}! 👋 How are things going?\n\n"
@@ -262,8 +461,9 @@ async def check_progress(context: ContextTypes.DEFAULT_TYPE):
                 "/done <number> - Mark task as Complete"
             )
             
-            await context.bot.send_message(chat_id=user_id, text=message)
-            logger.info(f"Sent reminder to user {user_id}")
+            await call(context.bot.send_message, chat_id=user_id, text=message)
+        
+        await broadcaster.run('check_progress', AsyncUser.iter_users(opt_in='reminders_enabled', with_tasks=True), deliver)
     except Exception as e:
         logger.error(f"Failed to send reminders: {e}")
 
@@ -277,12 +477,9 @@ async def morning_reminder(context: ContextTypes.DEFAULT_TYPE):
         return
     
     try:
-        users = Todo.get_all_users()
-        logger.info(f"Sending morning reminders to {len(users)} users")
-        
-        for user_id in users:
-            user_info = await context.bot.get_chat(user_id)
-            username = user_info.first_name
+        async def deliver(call, recipient):
+            user_id, first_name = recipient
+            username = await get_first_name(call, context.bot, user_id, first_name)
             
             message = (
                 f"Hi {username}! 🌅\n\n"
@@ -292,8 +489,9 @@ async def morning_reminder(context: ContextTypes.DEFAULT_TYPE):
                 f"/todo Complete project presentation"
             )
             
-            await context.bot.send_message(chat_id=user_id, text=message)
-            logger.info(f"Sent morning reminder to user {user_id}")
+            await call(context.bot.send_message, chat_id=user_id, text=message)
+        
+        await broadcaster.run('morning_reminder', AsyncUser.iter_users(opt_in='reminders_enabled', with_tasks=True), deliver)
             
     except Exception as e:
         logger.error(f"Failed to send morning reminders: {e}")
@@ -319,7 +517,7 @@ async def handle_todo_with_photo(update: Update, context: ContextTypes.DEFAULT_T
     if not task:
         task = "📷 Image task"
     
-    task_id = Todo.create(user_id, task, TaskState.TODO, image_file_id)
+    task_id = await AsyncTodo.create(user_id, task, TaskState.TODO, image_file_id)
     if task_id:
         await update.message.reply_text(f"Task added: {task} (ID: {task_id})")
     else:
@@ -330,7 +528,7 @@ async def handle_did_with_photo(update: Update, context: ContextTypes.DEFAULT_TY
     if not task:
         task = "📷 Image task completed"
     
-    if Todo.create(user_id, task, TaskState.DONE, image_file_id):
+    if await AsyncTodo.create(user_id, task, TaskState.DONE, image_file_id):
         await update.message.reply_text(f"✅ Logged completed task: {task}")
     else:
         await update.message.reply_text("Failed to log the task. Please try again.")
@@ -343,7 +541,7 @@ async def handle_focus_with_photo(update: Update, context: ContextTypes.DEFAULT_
             await update.message.reply_text("Please provide a task number.\nUsage: /focus 1")
             return
             
-        if Todo.update_state(task_id, user_id, TaskState.WIP):
+        if await AsyncTodo.update_state(task_id, user_id, TaskState.WIP):
             await update.message.reply_text(f"Task {task_id} is now in progress! 🚀")
         else:
             await update.message.reply_text("Failed to update task state. Please check the task number.")
@@ -358,7 +556,7 @@ async def handle_done_with_photo(update: Update, context: ContextTypes.DEFAULT_T
             await update.message.reply_text("Please provide a task number.\nUsage: /done 1")
             return
             
-        if Todo.update_state(task_id, user_id, TaskState.DONE):
+        if await AsyncTodo.update_state(task_id, user_id, TaskState.DONE):
             await update.message.reply_text(f"Task {task_id} completed! 🎉")
         else:
             await update.message.reply_text("Failed to update task state. Please check the task number.")
@@ -416,7 +614,7 @@ async def handle_cancel_reason(update: Update, context: ContextTypes.DEFAULT_TYP
     cancel_reason = update.message.text
     print(f"[DEBUG] Cancel reason received: {cancel_reason}")
 
-    if Todo.cancel_task(task_id, user_id, cancel_reason):
+    if await AsyncTodo.cancel_task(task_id, user_id, cancel_reason):
         print(f"[DEBUG] Successfully cancelled task {task_id}")
         await update.message.reply_text(f"Task {task_id} cancelled.\nReason: {cancel_reason}")
     else:
@@ -432,26 +630,8 @@ async def handle_cancel_reason(update: Update, context: ContextTypes.DEFAULT_TYP
     return ConversationHandler.END
 
 async def list_cancelled(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """List cancelled tasks."""
-    user_id = update.effective_user.id
-    
-    tasks = Todo.get_cancelled_tasks(user_id)
-    
-    if not tasks:
-        await update.message.reply_text("You have no cancelled tasks!")
-        return
-    
-    await update.message.reply_text("❌ Cancelled Tasks:")
-    for task_id, task, state, image_file_id, cancel_reason in tasks:
-        message = f"❌ {task_id}. {task}\nReason: {cancel_reason}"
-        
-        if image_file_id:
-            await update.message.reply_photo(
-                photo=image_file_id,
-                caption=message
-            )
-        else:
-            await update.message.reply_text(message)
+    """List cancelled tasks, one page at a time."""
+    await send_task_page(update, 'cancelled')
 
 async def generate_weekly_summary(context: ContextTypes.DEFAULT_TYPE):
     """Generate and send weekly summaries for all users."""
@@ -462,48 +642,42 @@ async def generate_weekly_summary(context: ContextTypes.DEFAULT_TYPE):
     start_date = end_date - timedelta(days=7)
     
     try:
-        users = Todo.get_all_users()
-        logger.info(f"Generating summaries for {len(users)} users")
-        
-        for user_id in users:
+        async def deliver(call, recipient):
+            user_id, first_name = recipient
             # Get completed tasks for the week
-            completed_tasks = Todo.get_tasks_completed_in_range(user_id, start_date, end_date)
+            completed_tasks = await AsyncTodo.get_tasks_completed_in_range(user_id, start_date, end_date)
             
             if not completed_tasks:
-                continue  # Skip users with no completed tasks
+                return False  # Skip users with no completed tasks
             
             # Format tasks for GPT
             task_list = "\n".join([f"- {task}" for _, task, _, _ in completed_tasks])
             
             # Generate summary using GPT
-            try:
-                response = openai_client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "You are a friendly personal assistant. Write a brief, engaging summary of someone's week based on their completed tasks. Make it personal and encouraging. Keep it to 2-3 paragraphs."},
-                        {"role": "user", "content": f"Here are the tasks they completed this week:\n{task_list}"}
-                    ]
-                )
-                
-                summary = response.choices[0].message.content
-                
-                # Get user's name
-                user_info = await context.bot.get_chat(user_id)
-                username = user_info.first_name
-                
-                # Send the weekly summary
-                message = (
-                    f"📖 Weekly Summary for {username}\n"
-                    f"Week of {start_date.strftime('%B %d')} - {end_date.strftime('%B %d')}\n\n"
-                    f"{summary}\n\n"
-                    f"You completed {len(completed_tasks)} tasks this week! 🎉"
-                )
-                
-                await context.bot.send_message(chat_id=user_id, text=message)
-                logger.info(f"Sent weekly summary to user {user_id}")
-                
-            except Exception as e:
-                logger.error(f"Error generating summary for user {user_id}: {e}")
+            summary = await acomplete(
+                llm,
+                [
+                    {"role": "system", "content": "You are a friendly personal assistant. Write a brief, engaging summary of someone's week based on their completed tasks. Make it personal and encouraging. Keep it to 2-3 paragraphs."},
+                    {"role": "user", "content": f"Here are the tasks they completed this week:\n{task_list}"}
+                ]
+            )
+            
+            # Get user's name
+            username = await get_first_name(call, context.bot, user_id, first_name)
+            
+            # Send the weekly summary
+            message = (
+                f"📖 Weekly Summary for {username}\n"
+                f"Week of {start_date.strftime('%B %d')} - {end_date.strftime('%B %d')}\n\n"
+                f"{summary}\n\n"
+                f"You completed {len(completed_tasks)} tasks this week! 🎉"
+            )
+            
+            await call(context.bot.send_message, chat_id=user_id, text=message)
+        
+        stats = await summary_broadcaster.run('weekly_summary', AsyncUser.iter_users(opt_in='weekly_summary_enabled', with_tasks=True), deliver)
+        logger.info(f"LLM cache: {LLMCache.stats()}")
+        return stats
                 
     except Exception as e:
         logger.error(f"Error in weekly summary generation: {e}")
@@ -513,47 +687,49 @@ async def summarize_tasks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     print('aaaa: ', user_id)
     
-    # Get optional days parameter
+    # Get optional days parameter; "fresh" skips the cached summary
+    args = list(context.args or [])
+    no_cache = 'fresh' in args
+    args = [arg for arg in args if arg != 'fresh']
     days = 7  # default
-    if context.args:
+    if args:
         try:
-            days = int(context.args[0])
+            days = int(args[0])
         except ValueError:
             await update.message.reply_text(
                 "Invalid number of days. Using default (7 days).\n"
-                "Usage: /summarize [number_of_days]"
+                "Usage: /summarize [number_of_days] [fresh]"
             )
     
     # Send initial message
     status_message = await update.message.reply_text("🤔 Analyzing your completed tasks...")
+    # Show the summary as it is written, editing at a rate Telegram accepts
+    progress = ProgressiveMessage(status_message, interval=STREAM_EDIT_INTERVAL)
     
     try:
-        # Call the summary endpoint using requests
-        response = requests.post(
-            'http://localhost:2108/api/summarize_done',
-            json={
-                'user_id': user_id,
-                'days': days
-            }
+        data = await fetch_summary(
+            user_id, days, no_cache,
+            on_text=lambda text: progress.update(f"📊 Summary of your last {days} days\n\n{text}")
         )
         
-        data = response.json()
-        
         if 'error' in data:
             await status_message.edit_text(f"❌ Error: {data['error']}")
             return
         
+        if not data.get('summary'):
+            await status_message.edit_text(f"No completed tasks found in the last {days} days.")
+            return
+        
         # Format the response
-        summary = data['summary']
         total_tasks = data.get('total_tasks', 0)
         
         message = (
             f"📊 *Summary of your last {days} days*\n\n"
-            f"{summary}\n\n"
+            f"{data['summary']}\n\n"
             f"Total tasks completed: {total_tasks}"
         )
         
-        await status_message.edit_text(
+        await progress.finish(
             message,
             parse_mode='Markdown'
         )
@@ -611,71 +787,126 @@ async def add_tags(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             return
         
-        # Verify task exists and belongs to user
-        with Todo.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                'SELECT id FROM tasks WHERE id = ? AND user_id = ?',
-                (task_id, user_id)
-            )
-            if not cursor.fetchone():
-                await update.message.reply_text("Task not found or you don't have permission to modify it.")
-                return
+        # Verify ownership, add tags and read them back in one transaction
+        all_tags = await AsyncTodo.add_tags(task_id, user_id, tags, TagSource.MANUAL)
+        if all_tags is None:
+            await update.message.reply_text("Task not found or you don't have permission to modify it.")
+            return
         
-        # Add tags
-        if Tag.add_tags_to_task(task_id, tags, TagSource.MANUAL):
-            # Get all tags for the task to show the update
-            all_tags = Tag.get_tags_for_task(task_id, include_source=True)
-            extracted_tags = [tag for tag, source in all_tags if source == str(TagSource.EXTRACTED)]
-            manual_tags = [tag for tag, source in all_tags if source == str(TagSource.MANUAL)]
-            
-            response = f"✅ Added tags to task {task_id}.\n"
-            if extracted_tags:
-                response += f"\nExtracted tags: {' '.join(['#' + tag for tag in extracted_tags])}"
-            if manual_tags:
-                response += f"\nManual tags: {' '.join(['#' + tag for tag in manual_tags])}"
-            
-            await update.message.reply_text(response)
-        else:
-            await update.message.reply_text("Failed to add tags. Please try again.")
+        extracted_tags = [tag for tag, source in all_tags if source == str(TagSource.EXTRACTED)]
+        manual_tags = [tag for tag, source in all_tags if source == str(TagSource.MANUAL)]
+        
+        response = f"✅ Added tags to task {task_id}.\n"
+        if extracted_tags:
+            response += f"\nExtracted tags: {' '.join(['#' + tag for tag in extracted_tags])}"
+        if manual_tags:
+            response += f"\nManual tags: {' '.join(['#' + tag for tag in manual_tags])}"
+        
+        await update.message.reply_text(response)
             
     except Exception as e:
         print(f"Error in add_tags: {e}")
         await update.message.reply_text("An error occurred while adding tags.")
 
-def main():
-    """Start the bot."""
-    # Get token from environment variable
-    bot_token = os.getenv('BOT_TOKEN')
-    if not bot_token:
-        logger.error("BOT_TOKEN environment variable is not set!")
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin only: profile the bot and send back the result. Usage: /profile [seconds] [mem]"""
+    if update.effective_user.id not in ADMIN_USER_IDS:
+        return
+
+    try:
+        seconds = int(context.args[0]) if context.args else 30
+    except ValueError:
+        seconds = 0
+    if not 1 <= seconds <= PROFILE_MAX_SECONDS:
+        await update.message.reply_text(
+            f"Usage: /profile [seconds, 1-{PROFILE_MAX_SECONDS}] [mem]\n"
+            "Example: /profile 30 mem"
+        )
+        return
+    memory = 'mem' in context.args[1:]
+
+    if profile_lock.locked():
+        await update.message.reply_text("A profile is already running.")
         return
 
-    # Create the Application and pass your bot's token
-    application = Application.builder().token(bot_token).build()
+    async with profile_lock:
+        await update.message.reply_text(
+            f"Profiling for {seconds}s{' with memory tracing' if memory else ''}..."
+        )
+        memory_text = await profiler.profile(seconds, memory=memory)
+        collapsed = profiler.collapsed()
+
+    stamp = datetime.now(TIMEZONE).strftime('%Y%m%d-%H%M%S')
+    await update.message.reply_document(
+        document=collapsed.encode(),
+        filename=f"profile-{stamp}.collapsed",
+        caption=f"{profiler.samples} samples over {profiler.elapsed:.1f}s, collapsed stacks for flamegraph.pl or speedscope"
+    )
+    if memory_text is not None:
+        await update.message.reply_document(document=memory_text.encode(), filename=f"memory-{stamp}.txt")
+
+async def post_init(application: Application):
+    """Start watching the event loop once the bot's loop is running."""
+    if loop_watchdog is not None:
+        loop_watchdog.start()
+
+async def post_shutdown(application: Application):
+    """Flush batched writes and release the database threads when the bot stops."""
+    if loop_watchdog is not None:
+        await loop_watchdog.stop()
+    if summary_http is not None:
+        await summary_http.aclose()
+    await llm.close()
+    disable_write_batching()
+    shutdown_executor()
+
+def build_application(bot_token: str, base_url: Optional[str] = None) -> Application:
+    """Create the Application with every handler registered.
+
+    base_url points the bot at another Bot API server, such as the local
+    fake one used by the load harness.
+    """
+    # Create the Application and pass your bot's token; Bot API calls
+    # (except long polling for updates) are timed for the metrics endpoint
+    builder = (Application.builder().token(bot_token).post_init(post_init).post_shutdown(post_shutdown)
+               .request(metrics.InstrumentedRequest(connection_pool_size=256)))
+    if base_url:
+        builder = builder.base_url(base_url)
+    # Different users' updates are handled concurrently, so one user's slow
+    # database call doesn't hold up everyone else; each user's own updates
+    # stay in order for the /cancel conversation. CONCURRENT_UPDATES=1 turns
+    # this off.
+    concurrent_updates = int(os.getenv('CONCURRENT_UPDATES', '32'))
+    if concurrent_updates > 1:
+        builder = builder.concurrent_updates(PerUserUpdateProcessor(concurrent_updates))
+    application = builder.build()
+    track = metrics.track_handler
 
     # 1. First, add the conversation handler
     cancel_conv_handler = ConversationHandler(
         entry_points=[
-            CommandHandler("cancel", cancel_task)
+            CommandHandler("cancel", track(cancel_task))
         ],
         states={
             WAITING_FOR_CANCEL_REASON: [
                 MessageHandler(
                     filters.TEXT & ~filters.COMMAND, 
-                    handle_cancel_reason,
+                    track(handle_cancel_reason),
                     block=True
                 )
             ]
         },
         fallbacks=[
-            CommandHandler("cancel", cancel_task),
-            CommandHandler("help", help_command)
+            CommandHandler("cancel", track(cancel_task)),
+            CommandHandler("help", track(help_command))
         ],
         allow_reentry=True,
         name="cancel_conversation"
     )
     
+    # Record who we hear from before any other handler runs
+    application.add_handler(TypeHandler(Update, track(track_user)), group=-1)
+    
     # Add conversation handler in group 1
     application.add_handler(cancel_conv_handler, group=1)
 
@@ -683,19 +914,19 @@ def main():
     photo_handlers = [
         MessageHandler(
             filters.PHOTO & filters.CaptionRegex('^/todo'),
-            handle_todo_photo
+            track(handle_todo_photo)
         ),
         MessageHandler(
             filters.PHOTO & filters.CaptionRegex('^/did'),
-            handle_did_photo
+            track(handle_did_photo)
         ),
         MessageHandler(
             filters.PHOTO & filters.CaptionRegex('^/focus'),
-            handle_focus_photo
+            track(handle_focus_photo)
         ),
         MessageHandler(
             filters.PHOTO & filters.CaptionRegex('^/done'),
-            handle_done_photo
+            track(handle_done_photo)
         )
     ]
     
@@ -704,31 +935,40 @@ def main():
 
     # 3. Then add all other command handlers (group 2)
     command_handlers = [
-        CommandHandler("start", start),
-        CommandHandler("help", help_command),
-        CommandHandler("todo", add_task),
-        CommandHandler("td", add_task),
-        CommandHandler("did", did_task),
-        CommandHandler("list", list_tasks),
-        CommandHandler("l", list_tasks),
-        CommandHandler("done_list", list_done),
-        CommandHandler("focus", focus),
-        CommandHandler("done", done_task),
-        CommandHandler("cancelled", list_cancelled),
-        CommandHandler("summarize", summarize_tasks),
-        CommandHandler("tag", add_tags)
+        CommandHandler("start", track(start)),
+        CommandHandler("help", track(help_command)),
+        CommandHandler("todo", track(add_task)),
+        CommandHandler("td", track(add_task)),
+        CommandHandler("did", track(did_task)),
+        CommandHandler("list", track(list_tasks)),
+        CommandHandler("l", track(list_tasks)),
+        CommandHandler("done_list", track(list_done)),
+        CommandHandler("focus", track(focus)),
+        CommandHandler("done", track(done_task)),
+        CommandHandler("cancelled", track(list_cancelled)),
+        CommandHandler("summarize", track(summarize_tasks)),
+        CommandHandler("tag", track(add_tags)),
+        # Runs alongside other updates, so the profile sees normal traffic
+        CommandHandler("profile", track(profile_command), block=False)
     ]
 
     # Add command handlers in group 2
     for handler in command_handlers:
         application.add_handler(handler, group=2)
 
+    # Newer/Older buttons on paged task lists
+    application.add_handler(CallbackQueryHandler(track(task_page_callback), pattern=r'^page\|'), group=2)
+    application.add_handler(CallbackQueryHandler(track(task_photos_callback), pattern=r'^photos\|'), group=2)
+    return application
+
+def schedule_jobs(application: Application):
+    """Register the scheduled reminder and summary jobs."""
     # Add job queues
     job_queue = application.job_queue
     
     # Check-in reminder during working hours (8-hour window)
     job_queue.run_repeating(
-        check_progress,
+        metrics.track_job(check_progress, 'check_progress'),
         interval=7200,  # 2-hour interval
         first=10,
         name='check_progress'
@@ -737,7 +977,7 @@ def main():
     
     # Daily morning reminder at 5 AM
     job_queue.run_daily(
-        morning_reminder,
+        metrics.track_job(morning_reminder, 'morning_reminder'),
         time=time(hour=5, minute=0, tzinfo=TIMEZONE),  # 5:00 AM UTC+7
         days=(0, 1, 2, 3, 4, 5),  # Monday to Saturday (0 = Monday, 6 = Sunday)
         name='morning_reminder'
@@ -746,13 +986,30 @@ def main():
 
     # Add weekly summary on Sundays at 8 PM
     job_queue.run_daily(
-        generate_weekly_summary,
+        metrics.track_job(generate_weekly_summary, 'weekly_summary'),
         time=time(hour=20, minute=0, tzinfo=TIMEZONE),  # 8:00 PM UTC+7
         days=[6],  # Sunday only
         name='weekly_summary'
     )
     logger.info("Configured weekly_summary job (Sundays at 8 PM)")
 
+def main():
+    """Start the bot."""
+    # Get token from environment variable
+    bot_token = os.getenv('BOT_TOKEN')
+    if not bot_token:
+        logger.error("BOT_TOKEN environment variable is not set!")
+        return
+
+    application = build_application(bot_token)
+    schedule_jobs(application)
+
+    # Prometheus metrics on METRICS_PORT, if set
+    metrics_port = os.getenv('METRICS_PORT')
+    if metrics_port:
+        metrics.start_server(int(metrics_port), os.getenv('METRICS_HOST', '0.0.0.0'))
+        logger.info(f"Serving metrics on port {metrics_port}")
+
     # Start the Bot
     logger.info("Starting bot...")
     application.run_polling()
@@ -8,7 +8,17 @@ import {
   Container,
   Heading,
 } from '@chakra-ui/react'
-import axios from 'axios'
+
+// Parse one Server-Sent Event block into { event, data }
+const parseEvent = (block) => {
+  let event = 'message'
+  const data = []
+  for (const line of block.split('\n')) {
+    if (line.startsWith('event:')) event = line.slice(6).trim()
+    else if (line.startsWith('data:')) data.push(line.slice(5).trim())
+  }
+  return { event, data: data.length ? JSON.parse(data.join('\n')) : {} }
+}
 
 function App() {
   const [prompt, setPrompt] = useState('')
@@ -21,11 +31,29 @@ function App() {
     }
 
     setIsLoading(true)
+    setResponse('')
     try {
-      const { data } = await axios.post('http://localhost:2108/api/chat', {
-        prompt: prompt.trim()
+      // Stream the reply so text shows up as soon as the model starts writing
+      const res = await fetch('http://localhost:2108/api/chat', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ prompt: prompt.trim(), stream: true })
       })
-      setResponse(data.response)
+      if (!res.ok) throw new Error((await res.json()).error)
+      const reader = res.body.pipeThrough(new TextDecoderStream()).getReader()
+      let buffer = ''
+      for (;;) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += value
+        const blocks = buffer.split('\n\n')
+        buffer = blocks.pop()
+        for (const block of blocks) {
+          const { event, data } = parseEvent(block)
+          if (event === 'error') throw new Error(data.error)
+          if (event === 'message') setResponse((text) => text + data.delta)
+        }
+      }
     } catch (error) {
       console.error('Error:', error)
     } finally {
@@ -0,0 +1,47 @@
+import sqlite3
+from contextlib import contextmanager
+
+# (name, table, columns) for every index this migration manages
+INDEXES = [
+    ('idx_tasks_user_state_created', 'tasks', 'user_id, state, created_at'),
+    ('idx_tags_tag_task', 'tags', 'tag, task_id'),
+]
+
+class Migration:
+    def __init__(self, db_file="nosy_bot.db"):
+        self.db_file = db_file
+        self.description = "🗂️ Add indexes for per-user task and tag lookups"
+
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_file)
+        try:
+            yield conn
+        finally:
+            conn.commit()
+            conn.close()
+
+    def up(self):
+        """Add composite indexes to tasks and tags tables"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                for name, table, columns in INDEXES:
+                    cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+                    print(f"✅ Index {name} on {table}({columns}) is in place")
+                cursor.execute('ANALYZE')
+            except Exception as e:
+                print(f"❌ Error during migration: {e}")
+                raise e
+
+    def down(self):
+        """Drop the indexes added by this migration"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                for name, _, _ in INDEXES:
+                    cursor.execute(f'DROP INDEX IF EXISTS {name}')
+                    print(f"✅ Successfully dropped index {name}")
+            except Exception as e:
+                print(f"❌ Error during migration rollback: {e}")
+                raise e
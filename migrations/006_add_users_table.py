@@ -0,0 +1,52 @@
+import sqlite3
+from contextlib import contextmanager
+
+class Migration:
+    def __init__(self, db_file="nosy_bot.db"):
+        self.db_file = db_file
+        self.description = "👤 Add users table with cached profile data"
+
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_file)
+        try:
+            yield conn
+        finally:
+            conn.commit()
+            conn.close()
+
+    def up(self):
+        """Create users table and backfill it from existing tasks"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS users (
+                        user_id INTEGER PRIMARY KEY,
+                        first_name TEXT,
+                        username TEXT,
+                        last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        reminders_enabled INTEGER NOT NULL DEFAULT 1,
+                        weekly_summary_enabled INTEGER NOT NULL DEFAULT 1
+                    )
+                ''')
+                # Names are filled in by the bot the next time it sees each user
+                cursor.execute('''
+                    INSERT OR IGNORE INTO users (user_id)
+                    SELECT DISTINCT user_id FROM tasks
+                ''')
+                print(f"✅ Users table is in place ({cursor.rowcount} users backfilled)")
+            except Exception as e:
+                print(f"❌ Error during migration: {e}")
+                raise e
+
+    def down(self):
+        """Drop users table"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute('DROP TABLE IF EXISTS users')
+                print("✅ Successfully dropped users table")
+            except Exception as e:
+                print(f"❌ Error during migration rollback: {e}")
+                raise e
@@ -0,0 +1,51 @@
+import sqlite3
+from contextlib import contextmanager
+
+class Migration:
+    def __init__(self, db_file="nosy_bot.db"):
+        self.db_file = db_file
+        self.description = "🧠 Add llm_cache table for model responses"
+
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_file)
+        try:
+            yield conn
+        finally:
+            conn.commit()
+            conn.close()
+
+    def up(self):
+        """Create llm_cache table"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS llm_cache (
+                        key TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        response TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        expires_at REAL NOT NULL,
+                        last_used_at REAL NOT NULL
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used
+                    ON llm_cache (last_used_at)
+                ''')
+                print("✅ llm_cache table is in place")
+            except Exception as e:
+                print(f"❌ Error during migration: {e}")
+                raise e
+
+    def down(self):
+        """Drop llm_cache table"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute('DROP TABLE IF EXISTS llm_cache')
+                print("✅ Successfully dropped llm_cache table")
+            except Exception as e:
+                print(f"❌ Error during migration rollback: {e}")
+                raise e
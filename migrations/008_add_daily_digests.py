@@ -0,0 +1,47 @@
+import sqlite3
+from contextlib import contextmanager
+
+class Migration:
+    def __init__(self, db_file="nosy_bot.db"):
+        self.db_file = db_file
+        self.description = "📅 Add daily_digests table for incremental summaries"
+
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_file)
+        try:
+            yield conn
+        finally:
+            conn.commit()
+            conn.close()
+
+    def up(self):
+        """Create daily_digests table"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS daily_digests (
+                        user_id INTEGER NOT NULL,
+                        day TEXT NOT NULL,
+                        digest TEXT NOT NULL,
+                        task_count INTEGER NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (user_id, day)
+                    )
+                ''')
+                print("✅ daily_digests table is in place")
+            except Exception as e:
+                print(f"❌ Error during migration: {e}")
+                raise e
+
+    def down(self):
+        """Drop daily_digests table"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute('DROP TABLE IF EXISTS daily_digests')
+                print("✅ Successfully dropped daily_digests table")
+            except Exception as e:
+                print(f"❌ Error during migration rollback: {e}")
+                raise e
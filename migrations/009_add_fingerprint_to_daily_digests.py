@@ -0,0 +1,71 @@
+import sqlite3
+from contextlib import contextmanager
+
+class Migration:
+    def __init__(self, db_file="nosy_bot.db"):
+        self.db_file = db_file
+        self.description = "🔑 Add fingerprint column to daily_digests"
+
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_file)
+        try:
+            yield conn
+        finally:
+            conn.commit()
+            conn.close()
+
+    def up(self):
+        """Add fingerprint column to daily_digests table"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("PRAGMA table_info(daily_digests)")
+                columns = [column[1] for column in cursor.fetchall()]
+
+                if 'fingerprint' not in columns:
+                    # Existing digests get NULL and are regenerated on next use
+                    cursor.execute('''
+                        ALTER TABLE daily_digests
+                        ADD COLUMN fingerprint TEXT
+                    ''')
+                    print("✅ Successfully added fingerprint column to daily_digests table")
+                else:
+                    print("ℹ️ fingerprint column already exists in daily_digests table")
+            except Exception as e:
+                print(f"❌ Error during migration: {e}")
+                raise e
+
+    def down(self):
+        """Remove fingerprint column from daily_digests table"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                # Create new table without fingerprint column
+                cursor.execute('''
+                    CREATE TABLE daily_digests_new (
+                        user_id INTEGER NOT NULL,
+                        day TEXT NOT NULL,
+                        digest TEXT NOT NULL,
+                        task_count INTEGER NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (user_id, day)
+                    )
+                ''')
+
+                # Copy data
+                cursor.execute('''
+                    INSERT INTO daily_digests_new (user_id, day, digest, task_count, created_at)
+                    SELECT user_id, day, digest, task_count, created_at FROM daily_digests
+                ''')
+
+                # Drop old table
+                cursor.execute('DROP TABLE daily_digests')
+
+                # Rename new table
+                cursor.execute('ALTER TABLE daily_digests_new RENAME TO daily_digests')
+
+                print("✅ Successfully removed fingerprint column from daily_digests table")
+            except Exception as e:
+                print(f"❌ Error during migration rollback: {e}")
+                raise e
@@ -1,11 +1,31 @@
-from typing import Any
 import sqlite3
 from contextlib import contextmanager
 import os
+import queue
+import threading
+from typing import List
+
+from .tracing import QueryHook, TracedConnection
+
+# Applied to every pooled connection when it is opened
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-16000',     # ~16MB page cache per connection
+    'PRAGMA mmap_size=134217728',   # 128MB memory-mapped I/O
+    'PRAGMA temp_store=MEMORY',
+)
 
 class Database:
-    def __init__(self, db_file="nosy_bot.db"):
+    def __init__(self, db_file="nosy_bot.db", pool_size=5, timeout=5.0):
         self.db_file = db_file
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()  # Per-thread connection of the open transaction
+        self._query_hooks: List[QueryHook] = []
         print(f"Initializing database with file: {os.path.abspath(db_file)}")
         self.init_db()
 
@@ -17,11 +37,152 @@ class Database:
             tables = cursor.fetchall()
             print("Available tables:", tables)
 
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection configured for pooled use."""
+        # check_same_thread is off because connections move between the
+        # database executor threads the bot and the Quart API run model calls
+        # on; the pool guarantees a connection is only ever used by one
+        # borrower at a time.
+        conn = sqlite3.connect(self.db_file, timeout=self.timeout, check_same_thread=False,
+                               factory=TracedConnection)
+        conn.hooks = self._query_hooks
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def add_query_hook(self, hook: QueryHook) -> QueryHook:
+        """Call hook(conn, sql, params, seconds) after every statement run on this database.
+
+        Statements are only timed while at least one hook is registered.
+        """
+        self._query_hooks.append(hook)
+        return hook
+
+    def remove_query_hook(self, hook: QueryHook):
+        self._query_hooks.remove(hook)
+
+    def _acquire(self) -> sqlite3.Connection:
+        """Borrow an idle connection, opening a new one while under pool_size."""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._opened < self.pool_size:
+                self._opened += 1
+                open_new = True
+            else:
+                open_new = False
+
+        if open_new:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        try:
+            return self._pool.get(timeout=self.timeout)
+        except queue.Empty:
+            raise RuntimeError(f"Timed out waiting for a database connection (pool_size={self.pool_size})")
+
+    def _release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool."""
+        self._pool.put_nowait(conn)
+
     @contextmanager
     def get_connection(self):
-        conn = sqlite3.connect(self.db_file)
-        try:
+        # Inside transaction() the thread's connection is shared and the
+        # outermost transaction decides whether to commit
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
             yield conn
+            return
+
+        conn = self._acquire()
+        try:
+            with self._collect_after_commit() as callbacks:
+                yield conn
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._release(conn)
+        self._run_after_commit(callbacks)
+
+    @contextmanager
+    def transaction(self):
+        """Unit of work: calls inside share one connection and commit once; nested calls use a savepoint."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.execute('SAVEPOINT nested')
+            try:
+                yield conn
+            except Exception:
+                conn.execute('ROLLBACK TO nested')
+                conn.execute('RELEASE nested')
+                raise
+            conn.execute('RELEASE nested')
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        try:
+            with self._collect_after_commit() as callbacks:
+                conn.execute('BEGIN IMMEDIATE')
+                yield conn
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
         finally:
-            conn.commit()
-            conn.close() 
\ No newline at end of file
+            self._local.conn = None
+            self._release(conn)
+        self._run_after_commit(callbacks)
+
+    @property
+    def in_transaction(self) -> bool:
+        """Whether the calling thread is inside transaction()."""
+        return getattr(self._local, 'conn', None) is not None
+
+    def after_commit(self, callback):
+        """Run callback once the current connection block commits.
+
+        Called outside any connection block, the callback runs immediately.
+        Callbacks are dropped if the block rolls back.
+        """
+        callbacks = getattr(self._local, 'after_commit', None)
+        if callbacks is None:
+            callback()
+        else:
+            callbacks.append(callback)
+
+    @contextmanager
+    def _collect_after_commit(self):
+        previous = getattr(self._local, 'after_commit', None)
+        callbacks = self._local.after_commit = []
+        try:
+            yield callbacks
+        finally:
+            self._local.after_commit = previous
+
+    def _run_after_commit(self, callbacks):
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in after-commit callback: {e}")
+
+    def close(self):
+        """Close all idle pooled connections."""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+class ActiveTaskCache:
+    """Size-bounded LRU cache of each user's active tasks and their tags.
+
+    Writers invalidate a user's entry after their transaction commits. Readers
+    take a version token before querying and only store the result if the
+    user wasn't invalidated in the meantime, so a read that raced a write
+    can never put stale rows back into the cache.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # user_id -> active task rows
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[Any]:
+        with self._lock:
+            if user_id in self._entries:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def version(self, user_id: int) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def put(self, user_id: int, tasks: list, version: int):
+        """Store a user's active tasks, unless they were invalidated after `version` was taken."""
+        with self._lock:
+            if self._versions.get(user_id, 0) != version:
+                return
+            self._entries[user_id] = tasks
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            for user_id in self._entries:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+# Process-wide cache used by Todo and Tag; None disables caching
+active_task_cache: Optional[ActiveTaskCache] = None
+
+def configure_active_task_cache(enabled: bool = True, maxsize: int = 1024) -> Optional[ActiveTaskCache]:
+    """Turn the active-task cache on (with a fresh, empty cache) or off."""
+    global active_task_cache
+    active_task_cache = ActiveTaskCache(maxsize) if enabled else None
+    return active_task_cache
@@ -0,0 +1,58 @@
+from typing import Dict, Optional, Tuple
+
+class DailyDigest:
+    """Stored per-day summaries of a user's completed tasks.
+
+    Each digest records how many tasks it was generated from and a
+    fingerprint of their ids (see Todo.fingerprint_done_by_day), so a day
+    whose completed tasks change later is regenerated instead of reused.
+    """
+    db = None  # Will be set by application
+
+    @classmethod
+    def get_connection(cls):
+        if cls.db is None:
+            raise RuntimeError("Database not initialized")
+        return cls.db.get_connection()
+
+    @classmethod
+    def create_table(cls):
+        """Create daily_digests table if it doesn't exist."""
+        with cls.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS daily_digests (
+                    user_id INTEGER NOT NULL,
+                    day TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    task_count INTEGER NOT NULL,
+                    fingerprint TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (user_id, day)
+                )
+            ''')
+
+    @classmethod
+    def get_range(cls, user_id: int, start_day: str, end_day: str) -> Dict[str, Tuple[str, int, Optional[str]]]:
+        """Get stored digests for days in [start_day, end_day] as {day: (digest, task_count, fingerprint)}."""
+        with cls.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                '''SELECT day, digest, task_count, fingerprint
+                   FROM daily_digests
+                   WHERE user_id = ? AND day BETWEEN ? AND ?''',
+                (user_id, start_day, end_day)
+            )
+            return {day: (digest, task_count, fingerprint)
+                    for day, digest, task_count, fingerprint in cursor.fetchall()}
+
+    @classmethod
+    def save(cls, user_id: int, day: str, digest: str, task_count: int, fingerprint: str):
+        """Store or replace the digest for one day."""
+        with cls.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                '''INSERT OR REPLACE INTO daily_digests (user_id, day, digest, task_count, fingerprint)
+                   VALUES (?, ?, ?, ?, ?)''',
+                (user_id, day, digest, task_count, fingerprint)
+            )
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, List, Optional
+
+class LLMCache:
+    """Persistent, content-addressed cache of model responses.
+
+    Entries are keyed by a hash of the model name and the full message list
+    (system prompt and task list included), so identical prompts from the bot
+    and the API share one entry. Entries expire after TTL seconds and the
+    least recently used ones, to within TOUCH_INTERVAL, are evicted beyond
+    MAX_ENTRIES.
+    """
+    db = None  # Will be set by application
+
+    TTL = 7 * 24 * 3600
+    MAX_ENTRIES = 10000
+    # Run eviction on every Nth put rather than on each one
+    EVICT_EVERY = 100
+    # How stale last_used_at may get before a hit writes it back, in seconds;
+    # LRU order only needs to be coarse, and most hits then stay read-only
+    TOUCH_INTERVAL = 3600
+
+    hits = 0
+    misses = 0
+    _puts = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_connection(cls):
+        if cls.db is None:
+            raise RuntimeError("Database not initialized")
+        return cls.db.get_connection()
+
+    @classmethod
+    def create_table(cls):
+        """Create llm_cache table if it doesn't exist."""
+        with cls.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used
+                ON llm_cache (last_used_at)
+            ''')
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict[str, str]]) -> str:
+        """Content hash of everything that determines the response."""
+        payload = json.dumps({'model': model, 'messages': messages}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def get(cls, key: str) -> Optional[str]:
+        """Get a cached response, or None if missing or expired."""
+        now = time.time()
+        with cls.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT response, last_used_at FROM llm_cache WHERE key = ? AND expires_at > ?',
+                (key, now)
+            )
+            row = cursor.fetchone()
+            if row and now - row[1] >= cls.TOUCH_INTERVAL:
+                cursor.execute('UPDATE llm_cache SET last_used_at = ? WHERE key = ?', (now, key))
+
+        with cls._lock:
+            if row:
+                cls.hits += 1
+            else:
+                cls.misses += 1
+        return row[0] if row else None
+
+    @classmethod
+    def put(cls, key: str, model: str, response: str):
+        """Store a response, evicting expired and least recently used entries now and then."""
+        now = time.time()
+        with cls.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                '''INSERT OR REPLACE INTO llm_cache
+                   (key, model, response, created_at, expires_at, last_used_at)
+                   VALUES (?, ?, ?, ?, ?, ?)''',
+                (key, model, response, now, now + cls.TTL, now)
+            )
+
+        with cls._lock:
+            cls._puts += 1
+            evict = cls._puts % cls.EVICT_EVERY == 0
+        if evict:
+            cls.evict()
+
+    @classmethod
+    def evict(cls) -> int:
+        """Delete expired entries and any beyond MAX_ENTRIES, least recently used first."""
+        with cls.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM llm_cache WHERE expires_at <= ?', (time.time(),))
+            removed = cursor.rowcount
+            cursor.execute(
+                '''DELETE FROM llm_cache WHERE key IN (
+                       SELECT key FROM llm_cache
+                       ORDER BY last_used_at DESC
+                       LIMIT -1 OFFSET ?
+                   )''',
+                (cls.MAX_ENTRIES,)
+            )
+            return removed + cursor.rowcount
+
+    @classmethod
+    def stats(cls) -> Dict[str, float]:
+        with cls._lock:
+            lookups = cls.hits + cls.misses
+            return {
+                'hits': cls.hits,
+                'misses': cls.misses,
+                'hit_rate': cls.hits / lookups if lookups else 0.0,
+            }
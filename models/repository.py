@@ -0,0 +1,177 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from .todo import Todo, TaskState
+from .tag import Tag, TagSource
+from .user import User
+from .write_queue import WriteQueue
+
+# Dedicated threads for blocking sqlite work, so a slow write or fsync
+# never runs on the asyncio event loop.
+_executor: Optional[ThreadPoolExecutor] = None
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get the database executor, sized to the connection pool on first use."""
+    global _executor
+    if _executor is None:
+        max_workers = getattr(Todo.db, 'pool_size', 4)
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db')
+    return _executor
+
+def shutdown_executor(wait: bool = True):
+    """Stop the database executor. A new one is created on next use."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
+
+async def run_in_db(fn, *args, **kwargs):
+    """Run a blocking model call on the database executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), partial(fn, *args, **kwargs))
+
+# Optional group-commit queue for writes; None means one transaction per call
+_write_queue: Optional[WriteQueue] = None
+
+def enable_write_batching(max_batch: int = 64, max_delay: float = 0.0) -> WriteQueue:
+    """Route repository writes through a group-commit WriteQueue."""
+    global _write_queue
+    if _write_queue is None:
+        _write_queue = WriteQueue(Todo.db, max_batch=max_batch, max_delay=max_delay)
+        _write_queue.start()
+    return _write_queue
+
+def disable_write_batching():
+    """Flush pending batched writes and go back to per-call commits."""
+    global _write_queue
+    if _write_queue is not None:
+        _write_queue.stop()
+        _write_queue = None
+
+async def run_write(fn, *args, **kwargs):
+    """Run a model write, batched with other writes when write batching is on."""
+    if _write_queue is None:
+        return await run_in_db(fn, *args, **kwargs)
+    return await asyncio.wrap_future(_write_queue.submit(fn, *args, **kwargs))
+
+class AsyncTodo:
+    """Awaitable mirror of the Todo model."""
+
+    extract_tags = staticmethod(Todo.extract_tags)
+
+    @classmethod
+    async def create(cls, user_id: int, task: str, state: TaskState = TaskState.TODO,
+                     image_file_id: str = None) -> Optional[int]:
+        return await run_write(Todo.create, user_id, task, state, image_file_id)
+
+    @classmethod
+    async def belongs_to_user(cls, task_id: int, user_id: int) -> bool:
+        return await run_in_db(Todo.belongs_to_user, task_id, user_id)
+
+    @classmethod
+    async def add_tags(cls, task_id: int, user_id: int, tags: List[str],
+                       source: TagSource = TagSource.MANUAL) -> Optional[List[Tuple[str, str]]]:
+        return await run_write(Todo.add_tags, task_id, user_id, tags, source)
+
+    @classmethod
+    async def get_active_tasks(cls) -> List[Tuple[int, int, str, int]]:
+        return await run_in_db(Todo.get_active_tasks)
+
+    @classmethod
+    async def update_state(cls, task_id: int, user_id: int, new_state: TaskState) -> bool:
+        return await run_write(Todo.update_state, task_id, user_id, new_state)
+
+    @classmethod
+    async def get_all_users(cls) -> List[int]:
+        return await run_in_db(Todo.get_all_users)
+
+    @classmethod
+    async def get_done_tasks(cls, user_id: int) -> List[Tuple[int, str, str, str]]:
+        return await run_in_db(Todo.get_done_tasks, user_id)
+
+    @classmethod
+    async def cancel_task(cls, task_id: int, user_id: int, cancel_reason: str) -> bool:
+        return await run_write(Todo.cancel_task, task_id, user_id, cancel_reason)
+
+    @classmethod
+    async def get_cancelled_tasks(cls, user_id: int) -> List[Tuple[int, str, str, str, str]]:
+        return await run_in_db(Todo.get_cancelled_tasks, user_id)
+
+    @classmethod
+    async def get_done_tasks_page(cls, user_id: int, limit: int = 10, cursor: Optional[Tuple[str, int]] = None,
+                                  newer: bool = False):
+        return await run_in_db(Todo.get_done_tasks_page, user_id, limit, cursor, newer)
+
+    @classmethod
+    async def get_cancelled_tasks_page(cls, user_id: int, limit: int = 10, cursor: Optional[Tuple[str, int]] = None,
+                                       newer: bool = False):
+        return await run_in_db(Todo.get_cancelled_tasks_page, user_id, limit, cursor, newer)
+
+    @classmethod
+    async def get_tasks_completed_in_range(cls, user_id: int, start_date: datetime,
+                                           end_date: datetime) -> List[Tuple[int, str, str, datetime]]:
+        return await run_in_db(Todo.get_tasks_completed_in_range, user_id, start_date, end_date)
+
+    @classmethod
+    async def get_active_tasks_by_user(cls, user_id, include_tag_source: bool = False):
+        return await run_in_db(Todo.get_active_tasks_by_user, user_id, include_tag_source)
+
+    @classmethod
+    async def get_task_tags(cls, task_id: int) -> list[str]:
+        return await run_in_db(Todo.get_task_tags, task_id)
+
+class AsyncTag:
+    """Awaitable mirror of the Tag model."""
+
+    @classmethod
+    async def add_tags_to_task(cls, task_id: int, tags: List[str],
+                               source: TagSource = TagSource.EXTRACTED) -> bool:
+        return await run_write(Tag.add_tags_to_task, task_id, tags, source)
+
+    @classmethod
+    async def get_tags_for_task(cls, task_id: int, include_source: bool = False) -> List[tuple]:
+        return await run_in_db(Tag.get_tags_for_task, task_id, include_source)
+
+    @classmethod
+    async def get_tags_for_tasks(cls, task_ids: Iterable[int],
+                                 include_source: bool = False) -> Dict[int, List[tuple]]:
+        return await run_in_db(Tag.get_tags_for_tasks, list(task_ids), include_source)
+
+    @classmethod
+    async def get_tasks_by_tag(cls, tag: str) -> List[int]:
+        return await run_in_db(Tag.get_tasks_by_tag, tag)
+
+class AsyncUser:
+    """Awaitable mirror of the User model."""
+
+    @classmethod
+    async def touch(cls, user_id: int, first_name: Optional[str], username: Optional[str] = None) -> bool:
+        # Checked on the loop so most updates never reach the database
+        if not User.should_touch(user_id, first_name, username):
+            return False
+        return await run_write(User.touch, user_id, first_name, username)
+
+    @classmethod
+    async def set_first_name(cls, user_id: int, first_name: str) -> bool:
+        return await run_write(User.set_first_name, user_id, first_name)
+
+    @classmethod
+    async def get_users_page(cls, after_user_id: int = 0, limit: int = 500, opt_in: Optional[str] = None,
+                             with_tasks: bool = False) -> List[Tuple[int, Optional[str]]]:
+        return await run_in_db(User.get_users_page, after_user_id, limit, opt_in, with_tasks)
+
+    @classmethod
+    async def iter_users(cls, opt_in: Optional[str] = None, with_tasks: bool = False,
+                         page_size: int = 500) -> AsyncIterator[Tuple[int, Optional[str]]]:
+        """Stream (user_id, first_name) for every user, fetching one page at a time."""
+        after_user_id = 0
+        while True:
+            page = await cls.get_users_page(after_user_id, page_size, opt_in, with_tasks)
+            for user in page:
+                yield user
+            if len(page) < page_size:
+                return
+            after_user_id = page[-1][0]
@@ -1,5 +1,7 @@
 from enum import Enum
-from typing import List, Optional
+from . import cache
+from functools import partial
+from typing import Dict, Iterable, List
 
 class TagSource(Enum):
     EXTRACTED = 'extracted'  # From task description
@@ -10,6 +12,7 @@ class TagSource(Enum):
 
 class Tag:
     db = None  # Will be set by application
+    MAX_BULK_IDS = 500
 
     @classmethod
     def get_connection(cls):
@@ -33,9 +36,15 @@ class Tag:
                 )
             ''')
 
+            # Index for looking up tasks by tag (see migration 005)
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_tags_tag_task
+                ON tags (tag, task_id)
+            ''')
+
     @classmethod
     def add_tags_to_task(cls, task_id: int, tags: List[str], source: TagSource = TagSource.EXTRACTED) -> bool:
-        """Add multiple tags to a task."""
+        """Add multiple tags to a task; inside a transaction, errors are raised instead of returning False."""
         try:
             with cls.get_connection() as conn:
                 cursor = conn.cursor()
@@ -43,11 +52,25 @@ class Tag:
                     'INSERT OR IGNORE INTO tags (task_id, tag, source) VALUES (?, ?, ?)',
                     [(task_id, tag.lower(), str(source)) for tag in tags]
                 )
+                cls._invalidate_task_owner(cursor, task_id)
             return True
         except Exception as e:
+            if cls.db is not None and cls.db.in_transaction:
+                raise
             print(f"Error adding tags: {e}")
             return False
 
+    @classmethod
+    def _invalidate_task_owner(cls, cursor, task_id: int):
+        """Drop the task owner's cached active tasks once the current write commits."""
+        active_cache = cache.active_task_cache
+        if active_cache is None:
+            return
+        cursor.execute('SELECT user_id FROM tasks WHERE id = ?', (task_id,))
+        row = cursor.fetchone()
+        if row:
+            cls.db.after_commit(partial(active_cache.invalidate, row[0]))
+
     @classmethod
     def get_tags_for_task(cls, task_id: int, include_source: bool = False) -> List[tuple]:
         """Get all tags for a task. Optionally include source information."""
@@ -60,6 +83,28 @@ class Tag:
                 cursor.execute('SELECT tag FROM tags WHERE task_id = ?', (task_id,))
                 return [row[0] for row in cursor.fetchall()]
 
+    @classmethod
+    def get_tags_for_tasks(cls, task_ids: Iterable[int], include_source: bool = False) -> Dict[int, List[tuple]]:
+        """Get tags for many tasks in one query, keyed by task id. Tasks without tags map to []."""
+        task_ids = list(dict.fromkeys(task_ids))
+        tags_by_task = {task_id: [] for task_id in task_ids}
+        if not task_ids:
+            return tags_by_task
+
+        with cls.get_connection() as conn:
+            cursor = conn.cursor()
+            # Chunk to stay under SQLite's bound-parameter limit
+            for start in range(0, len(task_ids), cls.MAX_BULK_IDS):
+                chunk = task_ids[start:start + cls.MAX_BULK_IDS]
+                placeholders = ', '.join('?' * len(chunk))
+                cursor.execute(
+                    f'SELECT task_id, tag, source FROM tags WHERE task_id IN ({placeholders}) ORDER BY id',
+                    chunk
+                )
+                for task_id, tag, source in cursor.fetchall():
+                    tags_by_task[task_id].append((tag, source) if include_source else tag)
+        return tags_by_task
+
     @classmethod
     def get_tasks_by_tag(cls, tag: str) -> List[int]:
         """Get all task IDs that have a specific tag."""
@@ -1,8 +1,11 @@
-from typing import List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 from enum import IntEnum
 from datetime import datetime
+import hashlib
 import re
-from .tag import Tag
+from functools import partial
+from . import cache
+from .tag import Tag, TagSource
 
 class TaskState(IntEnum):
     TODO = 0
@@ -21,6 +24,18 @@ class Todo:
         if cls.db is None:
             raise RuntimeError("Database not initialized")
         return cls.db.get_connection()
+
+    @classmethod
+    def transaction(cls):
+        if cls.db is None:
+            raise RuntimeError("Database not initialized")
+        return cls.db.transaction()
+
+    @classmethod
+    def _invalidate_active_tasks(cls, user_id: int):
+        """Drop the user's cached active tasks once the current write commits."""
+        if cache.active_task_cache is not None:
+            cls.db.after_commit(partial(cache.active_task_cache.invalidate, user_id))
     
     def __init__(self, user_id: int, task: str, id: int = None, created_at: str = None, 
                  state: TaskState = TaskState.TODO, image_file_id: str = None):
@@ -56,11 +71,18 @@ class Todo:
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     task_id INTEGER NOT NULL,
                     tag TEXT NOT NULL,
+                    source TEXT NOT NULL DEFAULT 'extracted',
                     FOREIGN KEY (task_id) REFERENCES tasks(id),
                     UNIQUE(task_id, tag)
                 )
             ''')
 
+            # Indexes for per-user lookups by state and date (see migration 005)
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_tasks_user_state_created
+                ON tasks (user_id, state, created_at)
+            ''')
+
     @classmethod
     def extract_tags(cls, task_description: str) -> list[str]:
         """Extract hashtags from task description."""
@@ -75,7 +97,8 @@ class Todo:
             # Extract tags from task description
             tags = cls.extract_tags(task)
             
-            with cls.get_connection() as conn:
+            # Task and tags commit together on one connection
+            with cls.transaction() as conn:
                 cursor = conn.cursor()
                 # Insert task
                 cursor.execute(
@@ -87,14 +110,38 @@ class Todo:
                 task_id = cursor.lastrowid
                 
                 # Add tags using Tag class
-                if tags:
-                    Tag.add_tags_to_task(task_id, tags)
+                if tags and not Tag.add_tags_to_task(task_id, tags):
+                    raise RuntimeError(f"Failed to add tags to task {task_id}")
+                
+                cls._invalidate_active_tasks(user_id)
                 
                 return task_id
         except Exception as e:
             print(f"Error adding task: {e}")
             return None
 
+    @classmethod
+    def belongs_to_user(cls, task_id: int, user_id: int) -> bool:
+        """Check that a task exists and belongs to the user."""
+        with cls.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'SELECT 1 FROM tasks WHERE id = ? AND user_id = ?',
+                (task_id, user_id)
+            )
+            return cursor.fetchone() is not None
+
+    @classmethod
+    def add_tags(cls, task_id: int, user_id: int, tags: List[str],
+                 source: TagSource = TagSource.MANUAL) -> Optional[List[Tuple[str, str]]]:
+        """Add tags to a user's task in one transaction and return its (tag, source) pairs; None if it isn't theirs."""
+        with cls.transaction():
+            if not cls.belongs_to_user(task_id, user_id):
+                return None
+            if not Tag.add_tags_to_task(task_id, tags, source):
+                raise RuntimeError(f"Failed to add tags to task {task_id}")
+            return Tag.get_tags_for_task(task_id, include_source=True)
+
     @classmethod
     def get_all_by_user(cls, user_id):
         """Get all active tasks (not done or cancelled) for a user."""
@@ -129,6 +176,7 @@ class Todo:
                     'UPDATE tasks SET state = ? WHERE id = ? AND user_id = ?',
                     (new_state, task_id, user_id)
                 )
+                cls._invalidate_active_tasks(user_id)
                 return cursor.rowcount > 0
         except Exception as e:
             print(f"Error updating task state: {e}")
@@ -161,7 +209,7 @@ class Todo:
     def cancel_task(cls, task_id: int, user_id: int, cancel_reason: str) -> bool:
         """Cancel a task with a reason."""
         try:
-            with cls.get_connection() as conn:
+            with cls.transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute(
                     '''
@@ -171,6 +219,7 @@ class Todo:
                     ''',
                     (TaskState.CANCELLED, cancel_reason, task_id, user_id, TaskState.DONE)
                 )
+                cls._invalidate_active_tasks(user_id)
                 return cursor.rowcount > 0
         except Exception as e:
             print(f"Error cancelling task: {e}")
@@ -191,6 +240,65 @@ class Todo:
             return [(id, task, TaskState(state).name, image_file_id, cancel_reason) 
                     for id, task, state, image_file_id, cancel_reason in cursor.fetchall()] 
 
+    @classmethod
+    def get_done_tasks_page(cls, user_id: int, limit: int = 10, cursor: Optional[Tuple[str, int]] = None,
+                            newer: bool = False) -> Tuple[List[Tuple[int, str, str, str]], Optional[Tuple[str, int]], Optional[Tuple[str, int]]]:
+        """Get one page of completed tasks for a user, newest first. See _get_tasks_page."""
+        rows, older_cursor, newer_cursor = cls._get_tasks_page(
+            user_id, TaskState.DONE, ('id', 'task', 'state', 'image_file_id'), limit, cursor, newer
+        )
+        return ([(id, task, TaskState(state).name, image_file_id)
+                 for id, task, state, image_file_id in rows], older_cursor, newer_cursor)
+
+    @classmethod
+    def get_cancelled_tasks_page(cls, user_id: int, limit: int = 10, cursor: Optional[Tuple[str, int]] = None,
+                                 newer: bool = False) -> Tuple[List[Tuple[int, str, str, str, str]], Optional[Tuple[str, int]], Optional[Tuple[str, int]]]:
+        """Get one page of cancelled tasks for a user, newest first. See _get_tasks_page."""
+        rows, older_cursor, newer_cursor = cls._get_tasks_page(
+            user_id, TaskState.CANCELLED, ('id', 'task', 'state', 'image_file_id', 'cancel_reason'),
+            limit, cursor, newer
+        )
+        return ([(id, task, TaskState(state).name, image_file_id, cancel_reason)
+                 for id, task, state, image_file_id, cancel_reason in rows], older_cursor, newer_cursor)
+
+    @classmethod
+    def _get_tasks_page(cls, user_id: int, state: TaskState, columns: Tuple[str, ...], limit: int,
+                        cursor: Optional[Tuple[str, int]], newer: bool):
+        """Keyset page of a user's tasks in one state as (rows, older_cursor, newer_cursor); columns start with id."""
+        params = [user_id, state]
+        keyset = ''
+        if cursor is not None:
+            keyset = f"AND (created_at, id) {'>' if newer else '<'} (?, ?)"
+            params += [cursor[0], cursor[1]]
+        order = 'ASC' if newer else 'DESC'
+        params.append(limit + 1)
+
+        with cls.get_connection() as conn:
+            db_cursor = conn.cursor()
+            db_cursor.execute(
+                f'''SELECT {', '.join(columns)}, created_at
+                   FROM tasks
+                   WHERE user_id = ? AND state = ? {keyset}
+                   ORDER BY created_at {order}, id {order}
+                   LIMIT ?''',
+                params
+            )
+            rows = db_cursor.fetchall()
+
+        # The extra row only tells us whether another page exists
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if newer:
+            rows.reverse()
+        if not rows:
+            return [], None, None
+
+        has_older = has_more if not newer else cursor is not None
+        has_newer = has_more if newer else cursor is not None
+        older_cursor = (rows[-1][-1], rows[-1][0]) if has_older else None
+        newer_cursor = (rows[0][-1], rows[0][0]) if has_newer else None
+        return [row[:-1] for row in rows], older_cursor, newer_cursor
+
     @classmethod
     def get_tasks_completed_in_range(cls, user_id: int, start_date: datetime, end_date: datetime) -> List[Tuple[int, str, str, datetime]]:
         """Get tasks completed between start_date and end_date."""
@@ -207,36 +315,93 @@ class Todo:
             # Format dates as strings in SQLite format: YYYY-MM-DD HH:MM:SS
             start_str = start_date.strftime('%Y-%m-%d %H:%M:%S')
             end_str = end_date.strftime('%Y-%m-%d %H:%M:%S')
-            
-            print('Query:', query)
-            print('Query params:', user_id, int(TaskState.DONE), start_str, end_str)
-            
+
             cursor.execute(query, (user_id, int(TaskState.DONE), start_str, end_str))
             results = cursor.fetchall()
-            print('Query results:', results)
-            
+
             return [(id, task, TaskState(state).name, created_at) 
-                    for id, task, state, created_at in cursor.fetchall()] 
+                    for id, task, state, created_at in results] 
 
     @classmethod
-    def get_active_tasks_by_user(cls, user_id):
-        """Get all active tasks (not done or cancelled) for a user."""
+    def iter_tasks_completed_in_range(cls, user_id: int, start_date: datetime, end_date: datetime,
+                                      batch_size: int = 500) -> Iterator[Tuple[int, str, str]]:
+        """Yield (id, task, created_at) of tasks completed in a date range, reading keyset batches."""
+        start_str = start_date.strftime('%Y-%m-%d %H:%M:%S')
+        end_str = end_date.strftime('%Y-%m-%d %H:%M:%S')
+        after = (start_str, 0)
+        while True:
+            with cls.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    '''SELECT id, task, created_at
+                       FROM tasks
+                       WHERE user_id = ? AND state = ?
+                       AND (created_at, id) > (?, ?) AND created_at <= ?
+                       ORDER BY created_at, id
+                       LIMIT ?''',
+                    (user_id, TaskState.DONE, after[0], after[1], end_str, batch_size)
+                )
+                rows = cursor.fetchall()
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            after = (rows[-1][2], rows[-1][0])
+
+    @classmethod
+    def fingerprint_done_by_day(cls, user_id: int, start_day: str, end_day: str) -> Dict[str, Tuple[int, str]]:
+        """Completed tasks per day (YYYY-MM-DD, inclusive range) as {day: (count, hash of their ids)}."""
+        with cls.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                '''SELECT date(created_at) AS day, id
+                   FROM tasks
+                   WHERE user_id = ? AND state = ?
+                   AND created_at >= ? AND created_at < date(?, '+1 day')''',
+                (user_id, TaskState.DONE, start_day, end_day)
+            )
+            ids_by_day: Dict[str, List[int]] = {}
+            for day, task_id in cursor.fetchall():
+                ids_by_day.setdefault(day, []).append(task_id)
+        return {day: (len(ids), hashlib.sha1(','.join(map(str, sorted(ids))).encode()).hexdigest()[:16])
+                for day, ids in ids_by_day.items()}
+
+    @classmethod
+    def get_active_tasks_by_user(cls, user_id, include_tag_source: bool = False):
+        """Get all active tasks (not done or cancelled) for a user, with their tags.
+
+        Tags are plain names, or (tag, source) pairs if include_tag_source is set.
+        Served from the active-task cache when it is enabled.
+        """
+        active_cache = cache.active_task_cache
+        tasks = active_cache.get(user_id) if active_cache is not None else None
+        if tasks is None:
+            version = active_cache.version(user_id) if active_cache is not None else None
+            tasks = cls._fetch_active_tasks(user_id)
+            if active_cache is not None:
+                active_cache.put(user_id, tasks, version)
+
+        if include_tag_source:
+            return tasks
+        return [(id, task, state, image_file_id, [tag for tag, _ in tags])
+                for id, task, state, image_file_id, tags in tasks]
+
+    @classmethod
+    def _fetch_active_tasks(cls, user_id):
+        """Load a user's active tasks with (tag, source) pairs from the database."""
         with cls.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT t.id, t.task, t.state, t.image_file_id,
-                       GROUP_CONCAT(tags.tag, ' ') as tags
-                FROM tasks t
-                LEFT JOIN tags ON t.id = tags.task_id
-                WHERE t.user_id = ? 
-                AND t.state NOT IN (?, ?)
-                GROUP BY t.id
-                ORDER BY t.id DESC
+                SELECT id, task, state, image_file_id
+                FROM tasks
+                WHERE user_id = ? 
+                AND state NOT IN (?, ?)
+                ORDER BY id DESC
             """, (user_id, TaskState.DONE, TaskState.CANCELLED))
-            
             results = cursor.fetchall()
-            return [(id, task, TaskState(state).name, image_file_id, tags.split() if tags else [])
-                    for id, task, state, image_file_id, tags in results]
+
+        tags_by_task = Tag.get_tags_for_tasks([row[0] for row in results], include_source=True)
+        return [(id, task, TaskState(state).name, image_file_id, tags_by_task[id])
+                for id, task, state, image_file_id in results]
 
     @classmethod
     def get_task_tags(cls, task_id: int) -> list[str]:
@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# hook(conn, sql, params, seconds), called after every statement; conn may be
+# used for follow-up queries such as EXPLAIN. params is None for executemany.
+QueryHook = Callable[[sqlite3.Connection, str, Any, float], None]
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement to its connection's query hooks.
+
+    SQLite does much of a SELECT's work while rows are fetched, so a query is
+    timed from execute() to the end of its first fetch. Statements without a
+    result set are reported as soon as they finish.
+    """
+
+    _pending = None  # (sql, params, seconds) of a query whose rows are not fetched yet
+
+    def execute(self, sql, parameters=()):
+        self._report()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._pending = (sql, parameters, time.perf_counter() - start)
+            if self.description is None:
+                self._report()
+
+    def executemany(self, sql, seq_of_parameters):
+        self._report()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._pending = (sql, None, time.perf_counter() - start)
+            self._report()
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, *args, **kwargs):
+        return self._fetch(super().fetchmany, *args, **kwargs)
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+    def close(self):
+        self._report()
+        super().close()
+
+    def _fetch(self, fetch, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fetch(*args, **kwargs)
+        finally:
+            if self._pending is not None:
+                sql, params, seconds = self._pending
+                self._pending = (sql, params, seconds + time.perf_counter() - start)
+                self._report()
+
+    def _report(self):
+        if self._pending is None:
+            return
+        sql, params, seconds = self._pending
+        self._pending = None
+        for hook in self.connection.hooks:
+            try:
+                hook(self.connection, sql, params, seconds)
+            except Exception:
+                logger.exception("Query hook failed")
+
+class TracedConnection(sqlite3.Connection):
+    """Connection whose statements go through TracedCursor while it has query hooks."""
+
+    hooks: List[QueryHook] = ()  # The owning Database's hook list once connected
+
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = TracedCursor if self.hooks else sqlite3.Cursor
+        return super().cursor(factory)
+
+    # The C implementations bypass an overridden Cursor.execute
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def explain(conn: sqlite3.Connection, sql: str, params) -> Optional[List[str]]:
+    """EXPLAIN QUERY PLAN of a statement, one indented line per step; None if it can't be explained."""
+    if params is None:
+        return None
+    try:
+        rows = sqlite3.Cursor(conn).execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+    except sqlite3.Error:
+        return None
+    depth = {0: -1}
+    plan = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        plan.append('  ' * depth[node] + detail)
+    return plan
+
+class SlowQueryLog:
+    """Query hook that logs slow statements with their query plan.
+
+    Statements taking `threshold` seconds or longer are logged as warnings
+    together with their EXPLAIN QUERY PLAN. A `sample_rate` fraction of the
+    other statements is logged at info level, to trace normal traffic without
+    logging all of it. Each record is a single JSON object.
+    """
+
+    def __init__(self, threshold: float = 0.1, sample_rate: float = 0.0, max_param_length: int = 100):
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.max_param_length = max_param_length
+        self.slow = 0  # Statements over the threshold so far
+
+    def __call__(self, conn: sqlite3.Connection, sql: str, params, seconds: float):
+        if seconds >= self.threshold:
+            self.slow += 1
+            logger.warning(self._record('slow_query', sql, params, seconds, explain(conn, sql, params)))
+        elif self.sample_rate and random.random() < self.sample_rate:
+            logger.info(self._record('query', sql, params, seconds))
+
+    def _param(self, value):
+        if isinstance(value, str) and len(value) > self.max_param_length:
+            return value[:self.max_param_length] + '...'
+        if isinstance(value, bytes):
+            return f'<{len(value)} bytes>'
+        return value
+
+    def _record(self, event: str, sql: str, params, seconds: float, plan: Optional[List[str]] = None) -> str:
+        record = {'event': event, 'ms': round(seconds * 1000, 3), 'sql': ' '.join(sql.split())}
+        if isinstance(params, dict):
+            record['params'] = {name: self._param(value) for name, value in params.items()}
+        elif params is not None:
+            record['params'] = [self._param(value) for value in params]
+        if plan is not None:
+            record['plan'] = plan
+        return json.dumps(record, default=str)
+
+def slow_query_log_from_env() -> Optional[SlowQueryLog]:
+    """SlowQueryLog configured by SLOW_QUERY_MS (0 turns it off) and QUERY_TRACE_SAMPLE."""
+    threshold_ms = float(os.getenv('SLOW_QUERY_MS', '100'))
+    if threshold_ms <= 0:
+        return None
+    return SlowQueryLog(threshold_ms / 1000, float(os.getenv('QUERY_TRACE_SAMPLE', '0')))
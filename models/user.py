@@ -0,0 +1,94 @@
+import time
+from typing import Optional, Tuple
+
+class User:
+    db = None  # Will be set by application
+
+    # How often an active user's last_seen is written back, in seconds
+    TOUCH_INTERVAL = 300
+    # Opt-in flag columns jobs can filter on
+    OPT_IN_FLAGS = ('reminders_enabled', 'weekly_summary_enabled')
+
+    _touched = {}  # user_id -> (first_name, username, monotonic time of last write)
+
+    @classmethod
+    def get_connection(cls):
+        if cls.db is None:
+            raise RuntimeError("Database not initialized")
+        return cls.db.get_connection()
+
+    @classmethod
+    def create_table(cls):
+        """Create users table if it doesn't exist."""
+        with cls.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    user_id INTEGER PRIMARY KEY,
+                    first_name TEXT,
+                    username TEXT,
+                    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    reminders_enabled INTEGER NOT NULL DEFAULT 1,
+                    weekly_summary_enabled INTEGER NOT NULL DEFAULT 1
+                )
+            ''')
+
+    @classmethod
+    def should_touch(cls, user_id: int, first_name: Optional[str], username: Optional[str]) -> bool:
+        """Whether touch() would write: the profile changed or last_seen is stale."""
+        touched = cls._touched.get(user_id)
+        if touched is None:
+            return True
+        last_first_name, last_username, last_write = touched
+        return ((first_name, username) != (last_first_name, last_username)
+                or time.monotonic() - last_write >= cls.TOUCH_INTERVAL)
+
+    @classmethod
+    def touch(cls, user_id: int, first_name: Optional[str], username: Optional[str] = None) -> bool:
+        """Record a user from an incoming update: insert or refresh their profile and last_seen."""
+        try:
+            with cls.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    '''INSERT INTO users (user_id, first_name, username, last_seen)
+                       VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                       ON CONFLICT(user_id) DO UPDATE SET
+                           first_name = excluded.first_name,
+                           username = excluded.username,
+                           last_seen = excluded.last_seen''',
+                    (user_id, first_name, username)
+                )
+            cls._touched[user_id] = (first_name, username, time.monotonic())
+            return True
+        except Exception as e:
+            print(f"Error recording user: {e}")
+            return False
+
+    @classmethod
+    def set_first_name(cls, user_id: int, first_name: str) -> bool:
+        """Fill in a user's display name without touching last_seen."""
+        with cls.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('UPDATE users SET first_name = ? WHERE user_id = ?', (first_name, user_id))
+            return cursor.rowcount > 0
+
+    @classmethod
+    def get_users_page(cls, after_user_id: int = 0, limit: int = 500, opt_in: Optional[str] = None,
+                       with_tasks: bool = False) -> list[Tuple[int, Optional[str]]]:
+        """Get (user_id, first_name) for up to `limit` users with ids above after_user_id, optionally only those with tasks."""
+        if opt_in is not None and opt_in not in cls.OPT_IN_FLAGS:
+            raise ValueError(f"Unknown opt-in flag: {opt_in}")
+        flag = f'AND {opt_in} = 1' if opt_in else ''
+        if with_tasks:
+            flag += ' AND EXISTS (SELECT 1 FROM tasks WHERE tasks.user_id = users.user_id)'
+        with cls.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f'''SELECT user_id, first_name
+                    FROM users
+                    WHERE user_id > ? {flag}
+                    ORDER BY user_id
+                    LIMIT ?''',
+                (after_user_id, limit)
+            )
+            return cursor.fetchall()
@@ -0,0 +1,109 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Tuple
+
+# Sentinel telling the writer thread to exit
+_STOP = object()
+
+class WriteQueue:
+    """Group commit for model writes.
+
+    Callers submit write callables (e.g. Todo.create) and get a Future back.
+    A single writer thread drains the queue and runs each group of writes in
+    one Database.transaction(), so a burst of N writes costs one commit
+    instead of N. A group takes every write already queued, up to max_batch;
+    writes that arrive during a commit form the next group, so batches grow
+    with load and a lone write is committed at once. max_delay, 0 by
+    default, makes each group wait that much longer for more writes, trading
+    latency for fewer commits.
+    """
+
+    def __init__(self, db, max_batch: int = 64, max_delay: float = 0.0):
+        self.db = db
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.writes = 0
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Flush queued writes and stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Queue a write; the Future resolves to fn's return value once committed."""
+        if self._thread is None:
+            raise RuntimeError("WriteQueue is not running")
+        future = Future()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def _next_batch(self) -> Tuple[List[tuple], bool]:
+        """Block for the first write, then collect more until the batch is full or due."""
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            # Writes already queued always join; only then wait out max_delay
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._commit_batch(batch)
+
+    def _commit_batch(self, batch: List[tuple]):
+        results = []
+        try:
+            with self.db.transaction() as conn:
+                for future, fn, args, kwargs in batch:
+                    # A savepoint per write so one failure doesn't undo the group
+                    conn.execute('SAVEPOINT write')
+                    try:
+                        results.append((future, fn(*args, **kwargs), None))
+                        conn.execute('RELEASE write')
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO write')
+                        conn.execute('RELEASE write')
+                        results.append((future, None, e))
+        except Exception as e:
+            # The commit itself failed, so nothing in the group was written
+            for future, *_ in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.writes += len(batch)
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable, Optional, Union
+
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Async token-bucket rate limiter shared by everything that talks to the Bot API.
+
+    Allows `rate` calls per second on average with bursts of up to `capacity`
+    (a fifth of a second's worth by default, so no one-second window can go
+    much past `rate`).
+    pause() stops every caller until a flood-control wait has passed.
+    """
+
+    def __init__(self, rate: float = 25.0, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate / 5)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+class BroadcastStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.recipients = 0
+        self.sent = 0
+        self.skipped = 0
+        self.failed = 0
+        self.retries = 0
+        self.elapsed = 0.0
+
+    def __str__(self):
+        return (f"{self.name}: {self.sent} sent, {self.skipped} skipped, {self.failed} failed, "
+                f"{self.retries} retries to {self.recipients} recipients in {self.elapsed:.1f}s")
+
+def retry_after_seconds(error: RetryAfter) -> float:
+    retry_after = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+# Returned by a recipient source once it is exhausted
+_DONE = object()
+
+def _recipient_source(recipients: Union[Iterable, AsyncIterable]) -> Callable[[], Awaitable[Any]]:
+    """Turn an iterable or async iterable into a `next()` that concurrent workers can share."""
+    if hasattr(recipients, '__aiter__'):
+        iterator = recipients.__aiter__()
+        # An async generator can't be advanced by two workers at once
+        lock = asyncio.Lock()
+
+        async def next_recipient():
+            async with lock:
+                try:
+                    return await iterator.__anext__()
+                except StopAsyncIteration:
+                    return _DONE
+    else:
+        iterator = iter(recipients)
+
+        async def next_recipient():
+            return next(iterator, _DONE)
+    return next_recipient
+
+class Broadcaster:
+    """Deliver per-user messages concurrently within Telegram's global rate limit.
+
+    Each recipient is handled by `deliver(call, recipient)`, which makes its
+    Bot API calls through `call` and returns False to skip the recipient.
+    Up to `concurrency` recipients are in flight at once; every call waits
+    for a token from the shared limiter. A RetryAfter pauses the whole
+    limiter and the call is retried, as are network errors, up to
+    max_retries per call. A timeout is only retried for idempotent calls:
+    after a read timeout Telegram has usually delivered the message already,
+    so resending it would send a duplicate. Other errors, such as Forbidden
+    from a user who blocked the bot, fail that recipient immediately. One
+    recipient's failure never affects the others.
+    """
+
+    def __init__(self, limiter: TokenBucket, concurrency: int = 10, max_retries: int = 3):
+        self.limiter = limiter
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+
+    async def call(self, fn: Callable[..., Awaitable], *args, stats: Optional[BroadcastStats] = None,
+                   idempotent: bool = False, **kwargs):
+        """Make one rate-limited Bot API call, retrying flood control and transient errors.
+
+        Pass idempotent=True for lookups such as get_chat, which are safe to
+        retry after a timeout.
+        """
+        attempt = 0
+        while True:
+            await self.limiter.acquire()
+            try:
+                return await fn(*args, **kwargs)
+            except RetryAfter as e:
+                # Flood control applies to the whole bot, so every sender waits
+                error, wait, pause_all = e, retry_after_seconds(e), True
+            except BadRequest:
+                # A NetworkError subclass, but the same request will fail again
+                raise
+            except TimedOut as e:
+                # Also a NetworkError subclass; the request may have gone through
+                if not idempotent:
+                    raise
+                error, wait, pause_all = e, 2 ** attempt, False
+            except NetworkError as e:
+                error, wait, pause_all = e, 2 ** attempt, False
+
+            attempt += 1
+            if attempt > self.max_retries:
+                raise error
+            if stats is not None:
+                stats.retries += 1
+            logger.warning(f"Bot API call failed ({error}), retrying in {wait:.0f}s")
+            if pause_all:
+                self.limiter.pause(wait)
+            else:
+                await asyncio.sleep(wait)
+
+    async def run(self, name: str, recipients: Union[Iterable, AsyncIterable],
+                  deliver: Callable[[Callable[..., Awaitable], Any], Awaitable[Optional[bool]]]) -> BroadcastStats:
+        """Deliver to every recipient and return delivery stats.
+
+        deliver(call, recipient) gets a `call` bound to this run. Recipients
+        may be a plain or async iterable and are pulled lazily, so a paged
+        generator is never materialised.
+        """
+        stats = BroadcastStats(name)
+        start = time.monotonic()
+
+        async def call(fn, *args, **kwargs):
+            return await self.call(fn, *args, stats=stats, **kwargs)
+
+        next_recipient = _recipient_source(recipients)
+
+        async def worker():
+            while (recipient := await next_recipient()) is not _DONE:
+                stats.recipients += 1
+                try:
+                    if await deliver(call, recipient) is False:
+                        stats.skipped += 1
+                    else:
+                        stats.sent += 1
+                except Exception as e:
+                    stats.failed += 1
+                    logger.error(f"{name}: failed to deliver to {recipient}: {e}")
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+        stats.elapsed = time.monotonic() - start
+        logger.info(str(stats))
+        return stats
@@ -0,0 +1,62 @@
+from typing import AsyncIterator, Dict, List
+
+from models.llm_cache import LLMCache
+from models.repository import run_in_db, run_write
+from services import metrics
+from services.providers import LLMProvider
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken missing or its encoding can't be loaded: estimate instead
+    _encoding = None
+
+CHARS_PER_TOKEN = 4  # Rough average for English text, used without tiktoken
+
+def count_tokens(text: str) -> int:
+    """Number of model tokens in text (estimated if tiktoken is unavailable)."""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to at most max_tokens tokens."""
+    if _encoding is not None:
+        tokens = _encoding.encode(text)
+        return text if len(tokens) <= max_tokens else _encoding.decode(tokens[:max_tokens])
+    return text[:max_tokens * CHARS_PER_TOKEN]
+
+async def acomplete(provider: LLMProvider, messages: List[Dict[str, str]], use_cache: bool = True) -> str:
+    """Chat completion from an LLM provider, served from LLMCache when possible."""
+    key = LLMCache.make_key(provider.model, messages)
+    if use_cache:
+        cached = await run_in_db(LLMCache.get, key)
+        metrics.LLM_CACHE.labels('miss' if cached is None else 'hit').inc()
+        if cached is not None:
+            return cached
+
+    with metrics.llm_call(provider.model, 'complete'):
+        content = await provider.complete(messages)
+    await run_write(LLMCache.put, key, provider.model, content)
+    return content
+
+async def astream(provider: LLMProvider, messages: List[Dict[str, str]], use_cache: bool = True) -> AsyncIterator[str]:
+    """Stream a chat completion from an LLM provider as text deltas.
+
+    A cached response is yielded as a single delta. A streamed response is
+    cached once it has been received in full.
+    """
+    key = LLMCache.make_key(provider.model, messages)
+    if use_cache:
+        cached = await run_in_db(LLMCache.get, key)
+        metrics.LLM_CACHE.labels('miss' if cached is None else 'hit').inc()
+        if cached is not None:
+            yield cached
+            return
+
+    parts = []
+    with metrics.llm_call(provider.model, 'stream'):
+        async for delta in provider.stream(messages):
+            parts.append(delta)
+            yield delta
+    await run_write(LLMCache.put, key, provider.model, "".join(parts))
@@ -0,0 +1,159 @@
+"""Prometheus metrics for the bot and the API.
+
+Histograms time command handlers, scheduled jobs, model-layer methods, Bot
+API calls, LLM calls and event-loop lag; counters track their errors, the
+LLM and active-task cache hit rates and event-loop stalls. The bot serves
+them on METRICS_PORT and the API at /metrics.
+"""
+import functools
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from typing import Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import start_http_server
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from telegram.request import HTTPXRequest
+
+from models import cache as task_cache
+
+# Single-row lookups take tens of microseconds; the defaults start at 5ms
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+JOB_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+HANDLER_SECONDS = Histogram('nosy_handler_seconds', 'Time spent in a bot update handler', ['handler'])
+HANDLER_ERRORS = Counter('nosy_handler_errors_total', 'Bot update handlers that raised', ['handler'])
+JOB_SECONDS = Histogram('nosy_job_seconds', 'Scheduled job run time', ['job'], buckets=JOB_BUCKETS)
+JOB_ERRORS = Counter('nosy_job_errors_total', 'Scheduled job runs that raised', ['job'])
+DB_SECONDS = Histogram('nosy_db_call_seconds', 'Time spent in a model method', ['method'], buckets=DB_BUCKETS)
+DB_ERRORS = Counter('nosy_db_call_errors_total', 'Model methods that raised', ['method'])
+BOT_API_SECONDS = Histogram('nosy_bot_api_seconds', 'Bot API request latency', ['method'])
+BOT_API_ERRORS = Counter('nosy_bot_api_errors_total', 'Bot API requests that failed or got an error status', ['method'])
+LLM_SECONDS = Histogram('nosy_llm_seconds', 'Model call latency, to the last token for streams', ['model', 'mode'],
+                        buckets=LLM_BUCKETS)
+LLM_ERRORS = Counter('nosy_llm_errors_total', 'Model calls that raised', ['model', 'mode'])
+LLM_CACHE = Counter('nosy_llm_cache_lookups_total', 'LLM response cache lookups', ['result'])
+API_SECONDS = Histogram('nosy_api_request_seconds', 'API request latency', ['endpoint', 'status'])
+LOOP_LAG_SECONDS = Histogram('nosy_event_loop_lag_seconds', 'How late the event loop ran a timer callback',
+                             buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+LOOP_STALLS = Counter('nosy_event_loop_stalls_total', 'Event loop stalls over the watchdog threshold', ['source'])
+
+# Connection helpers hand out resources rather than doing work worth timing
+UNTIMED_METHODS = {'get_connection', 'transaction'}
+
+def _timed(func, seconds, errors):
+    """Wrap a sync or async function to observe its run time and count its exceptions."""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                seconds.observe(time.perf_counter() - start)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            seconds.observe(time.perf_counter() - start)
+    return wrapper
+
+@contextmanager
+def timer(seconds, errors):
+    """Observe the run time of a block in `seconds` and count its exceptions in `errors`."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        errors.inc()
+        raise
+    finally:
+        seconds.observe(time.perf_counter() - start)
+
+def track_handler(callback):
+    """Time an update handler callback under its function name."""
+    name = callback.__name__
+    return _timed(callback, HANDLER_SECONDS.labels(name), HANDLER_ERRORS.labels(name))
+
+def track_job(callback, name: str):
+    """Time a scheduled job callback under its job name."""
+    return _timed(callback, JOB_SECONDS.labels(name), JOB_ERRORS.labels(name))
+
+def llm_call(model: str, mode: str):
+    """Timer for one model call; mode is "complete" or "stream"."""
+    return timer(LLM_SECONDS.labels(model, mode), LLM_ERRORS.labels(model, mode))
+
+def instrument_models(*models):
+    """Time every public classmethod of each model class as "<Class>.<method>".
+
+    Generators, which do their work after returning, and the connection
+    helpers are left alone. Calling this again for the same class is a no-op.
+    """
+    for model in models:
+        for name, attr in list(vars(model).items()):
+            if name.startswith('_') or name in UNTIMED_METHODS or not isinstance(attr, classmethod):
+                continue
+            func = attr.__func__
+            if hasattr(func, '__wrapped__') or inspect.isgeneratorfunction(func):
+                continue
+            label = f'{model.__name__}.{name}'
+            setattr(model, name, classmethod(_timed(func, DB_SECONDS.labels(label), DB_ERRORS.labels(label))))
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest that times every Bot API call by method name."""
+
+    async def do_request(self, url, method, request_data=None, *args, **kwargs):
+        # File downloads carry the file path, which would make a label per file
+        endpoint = 'file' if '/file/' in url else url.rsplit('/', 1)[-1]
+        with timer(BOT_API_SECONDS.labels(endpoint), BOT_API_ERRORS.labels(endpoint)):
+            code, payload = await super().do_request(url, method, request_data, *args, **kwargs)
+        if code >= 400:
+            BOT_API_ERRORS.labels(endpoint).inc()
+        return code, payload
+
+class ActiveTaskCacheCollector:
+    """Exports the process-wide active-task cache's hit, miss and size counts."""
+
+    def collect(self):
+        cache = task_cache.active_task_cache
+        if cache is None:
+            return
+        stats = cache.stats()
+        lookups = CounterMetricFamily('nosy_active_task_cache_lookups', 'Active-task cache lookups',
+                                      labels=['result'])
+        lookups.add_metric(['hit'], stats['hits'])
+        lookups.add_metric(['miss'], stats['misses'])
+        yield lookups
+        yield GaugeMetricFamily('nosy_active_task_cache_users', 'Users in the active-task cache', value=stats['size'])
+
+REGISTRY.register(ActiveTaskCacheCollector())
+
+def start_server(port: int, host: str = '0.0.0.0'):
+    """Serve this process's metrics over HTTP from a background thread."""
+    start_http_server(port, addr=host)
+
+def render() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, and its content type.
+
+    With PROMETHEUS_MULTIPROC_DIR set to a directory shared by the Hypercorn
+    workers, the samples of every worker are merged.
+    """
+    registry = REGISTRY
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,129 @@
+"""On-demand sampling profiler.
+
+While running, a background thread samples the stack of every other thread
+at a fixed interval and counts identical stacks, which gives the collapsed
+stack format read by flamegraph.pl, speedscope and similar tools. Memory
+profiles compare two tracemalloc snapshots. Nothing is installed or traced
+while no profile is running.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEMORY_FRAMES = 10  # Frames kept per allocation while tracing memory
+MEMORY_TOP = 25     # Allocation sites listed in a memory report
+
+def _frame_name(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(PROJECT_ROOT + os.sep):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    # Semicolons separate frames in the collapsed format
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({filename}:{code.co_firstlineno})".replace(';', ',')
+
+def memory_report(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, limit: int = MEMORY_TOP) -> str:
+    """Allocation sites that grew the most between two snapshots, with their tracebacks."""
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, '<frozen importlib._bootstrap>'))
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'traceback')
+    lines = [f"Memory growth: {sum(stat.size_diff for stat in stats) / 1024:+.1f} KiB in total",
+             f"Top {min(limit, len(stats))} allocation sites:"]
+    for stat in stats[:limit]:
+        lines.append(f"\n{stat.size_diff / 1024:+.1f} KiB, {stat.count_diff:+d} blocks "
+                     f"(now {stat.size / 1024:.1f} KiB in {stat.count} blocks)")
+        lines.extend(stat.traceback.format(most_recent_first=True))
+    return "\n".join(lines) + "\n"
+
+class SamplingProfiler:
+    """Samples every thread's stack each `interval` seconds while running.
+
+    One profile runs at a time; start() while running raises RuntimeError.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.stacks = Counter()  # "thread;outermost;...;innermost" -> samples
+        self.samples = 0
+        self.elapsed = 0.0  # Seconds sampled by the last profile
+        self._started = 0.0
+        self._names: Dict[object, str] = {}  # code object -> frame name
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self.running:
+            raise RuntimeError("A profile is already running")
+        self.stacks.clear()
+        self.samples = 0
+        self._started = time.perf_counter()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._sample, name='profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        self.elapsed = time.perf_counter() - self._started
+
+    def _name(self, code) -> str:
+        name = self._names.get(code)
+        if name is None:
+            name = self._names[code] = _frame_name(code)
+        return name
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._name(frame.f_code))
+                    frame = frame.f_back
+                stack.append(thread_names.get(thread_id, str(thread_id)))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """The samples in collapsed stack format, one "frame;frame;... count" line per stack."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    async def profile(self, seconds: float, memory: bool = False) -> Optional[str]:
+        """Sample for `seconds` without blocking the event loop.
+
+        With memory, allocations are traced for the same period and the
+        memory_report() of their growth is returned. Snapshots are taken
+        outside the sampled period, so they don't show up in the profile.
+        """
+        if self.running:
+            raise RuntimeError("A profile is already running")
+        started_tracing = memory and not tracemalloc.is_tracing()
+        try:
+            if started_tracing:
+                tracemalloc.start(MEMORY_FRAMES)
+            before = await asyncio.to_thread(tracemalloc.take_snapshot) if memory else None
+            self.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                self.stop()
+            if not memory:
+                return None
+            after = await asyncio.to_thread(tracemalloc.take_snapshot)
+            return await asyncio.to_thread(memory_report, before, after)
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import os
+import random
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, List, Optional
+
+Messages = List[Dict[str, str]]
+
+class LLMError(Exception):
+    """A model call failed."""
+
+class LLMProvider(ABC):
+    """Chat model backend shared by the bot and the API.
+
+    `model` names the model and is part of every LLM cache key, so replies
+    from different providers never mix.
+    """
+    model = None
+
+    @abstractmethod
+    async def complete(self, messages: Messages) -> str:
+        """Reply to a conversation."""
+
+    async def stream(self, messages: Messages) -> AsyncIterator[str]:
+        """Reply to a conversation as text deltas. Defaults to one delta."""
+        yield await self.complete(messages)
+
+    async def close(self):
+        """Release network resources."""
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI chat completions on an AsyncOpenAI client."""
+
+    def __init__(self, model: str = "gpt-3.5-turbo", api_key: Optional[str] = None,
+                 base_url: Optional[str] = None, timeout: float = 60, max_retries: int = 1):
+        from openai import AsyncOpenAI
+
+        self.model = model
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout,
+                                  max_retries=max_retries)
+
+    async def complete(self, messages: Messages) -> str:
+        response = await self.client.chat.completions.create(model=self.model, messages=messages)
+        return response.choices[0].message.content
+
+    async def stream(self, messages: Messages) -> AsyncIterator[str]:
+        stream = await self.client.chat.completions.create(model=self.model, messages=messages, stream=True)
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+    async def close(self):
+        await self.client.close()
+
+class OfflineProvider(LLMProvider):
+    """Deterministic local stand-in for load tests and offline development.
+
+    Each reply is built from a hash of the conversation, so the same prompt
+    always gets the same answer (and the same cache key). A call takes
+    `latency` seconds and fails with probability `failure_rate`, drawn from
+    a generator seeded with `seed` so runs are repeatable.
+    """
+
+    def __init__(self, latency: float = 0.2, failure_rate: float = 0.0, seed: int = 0,
+                 words: int = 60, model: str = "offline"):
+        self.model = model
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.words = words
+        self.calls = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+
+    def _reply(self, messages: Messages) -> List[str]:
+        digest = hashlib.sha256(repr(messages).encode()).hexdigest()
+        return [f"{digest[i % 60:i % 60 + 4]}" for i in range(self.words)]
+
+    def _maybe_fail(self):
+        self.calls += 1
+        if self._random.random() < self.failure_rate:
+            self.failures += 1
+            raise LLMError("Offline provider: simulated failure")
+
+    async def complete(self, messages: Messages) -> str:
+        await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        return " ".join(self._reply(messages))
+
+    async def stream(self, messages: Messages) -> AsyncIterator[str]:
+        # Time to first token is a quarter of the latency; the rest is spread over the words
+        await asyncio.sleep(self.latency / 4)
+        self._maybe_fail()
+        words = self._reply(messages)
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.latency * 3 / 4 / len(words))
+            yield word if i == 0 else f" {word}"
+
+def provider_from_env() -> LLMProvider:
+    """Build the provider named by LLM_PROVIDER (openai or offline)."""
+    name = os.getenv('LLM_PROVIDER', 'openai').lower()
+    if name == 'offline':
+        return OfflineProvider(
+            latency=float(os.getenv('OFFLINE_LLM_LATENCY_MS', '200')) / 1000,
+            failure_rate=float(os.getenv('OFFLINE_LLM_FAILURE_RATE', '0')),
+            seed=int(os.getenv('OFFLINE_LLM_SEED', '0'))
+        )
+    if name == 'openai':
+        return OpenAIProvider(
+            model=os.getenv('LLM_MODEL', 'gpt-3.5-turbo'),
+            api_key=os.getenv('OPENAI_API_KEY'),
+            timeout=float(os.getenv('LLM_TIMEOUT', '60'))
+        )
+    raise ValueError(f"Unknown LLM_PROVIDER: {name}")
@@ -0,0 +1,127 @@
+import asyncio
+import time
+from typing import List, Sequence, Tuple
+
+from telegram import InputMediaPhoto, Message
+from telegram.constants import MessageLimit
+from telegram.error import BadRequest, RetryAfter
+
+from services.broadcast import retry_after_seconds
+
+# Telegram accepts 2-10 photos per sendMediaGroup call
+MEDIA_GROUP_SIZE = 10
+
+def pack_messages(blocks: Sequence[str], limit: int = MessageLimit.MAX_TEXT_LENGTH,
+                  separator: str = "\n") -> List[str]:
+    """Pack text blocks, in order, into as few messages of at most `limit` characters as possible.
+
+    A block only spills into the next message when it doesn't fit; a single
+    block longer than `limit` is split across messages.
+    """
+    messages = []
+    current = ""
+    for block in blocks:
+        while len(block) > limit:
+            if current:
+                messages.append(current)
+                current = ""
+            messages.append(block[:limit])
+            block = block[limit:]
+        if not current:
+            current = block
+        elif len(current) + len(separator) + len(block) <= limit:
+            current += separator + block
+        else:
+            messages.append(current)
+            current = block
+    if current:
+        messages.append(current)
+    return messages
+
+def media_groups(photos: Sequence[Tuple[str, str]]) -> List[List[InputMediaPhoto]]:
+    """Split (file_id, caption) pairs into sendMediaGroup-sized batches."""
+    media = [
+        InputMediaPhoto(media=file_id, caption=caption[:MessageLimit.CAPTION_LENGTH])
+        for file_id, caption in photos
+    ]
+    return [media[i:i + MEDIA_GROUP_SIZE] for i in range(0, len(media), MEDIA_GROUP_SIZE)]
+
+async def reply_photos(message: Message, photos: Sequence[Tuple[str, str]]) -> int:
+    """Reply with captioned photos in as few media groups as possible. Returns the Bot API calls made."""
+    calls = 0
+    for group in media_groups(photos):
+        if len(group) == 1:
+            # A media group needs at least two items
+            await message.reply_photo(photo=group[0].media, caption=group[0].caption)
+        else:
+            await message.reply_media_group(media=group)
+        calls += 1
+    return calls
+
+async def reply_task_list(message: Message, header: str, text_blocks: Sequence[str],
+                          photos: Sequence[Tuple[str, str]] = ()) -> int:
+    """Reply with a task list using a near-constant number of Bot API calls.
+
+    The header and text-only tasks are packed into as few messages as the
+    length limit allows, followed by photo tasks as captioned media groups.
+    Returns the number of Bot API calls made.
+    """
+    calls = 0
+    for text in pack_messages([header, *text_blocks]):
+        await message.reply_text(text)
+        calls += 1
+    return calls + await reply_photos(message, photos)
+
+class ProgressiveMessage:
+    """Edits a message as streamed text arrives, at most once per `interval` seconds.
+
+    Telegram allows roughly one edit per second in a chat, so intermediate
+    text is dropped between edits; an edit rejected for flood control is
+    skipped and pushes the next one back. Call finish() with the final text;
+    it waits for the interval rather than skipping.
+    """
+
+    def __init__(self, message: Message, interval: float = 1.0):
+        self.message = message
+        self.interval = interval
+        self.edits = 0
+        self._next_edit = 0.0
+        self._shown = None
+
+    async def update(self, text: str):
+        """Show text if the last edit is at least `interval` seconds old."""
+        now = time.monotonic()
+        if now < self._next_edit:
+            return
+        self._next_edit = now + self.interval
+        await self._edit(text[:MessageLimit.MAX_TEXT_LENGTH])
+
+    async def finish(self, text: str, **kwargs):
+        """Show the final text once the edit interval allows, retrying once after flood control."""
+        delay = self._next_edit - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            await self._edit_text(text, **kwargs)
+        except RetryAfter as e:
+            await asyncio.sleep(retry_after_seconds(e))
+            await self._edit_text(text, **kwargs)
+        self._next_edit = time.monotonic() + self.interval
+
+    async def _edit(self, text: str):
+        if not text.strip() or text == self._shown:
+            return
+        try:
+            await self._edit_text(text)
+        except RetryAfter as e:
+            self._next_edit = time.monotonic() + retry_after_seconds(e)
+
+    async def _edit_text(self, text: str, **kwargs):
+        try:
+            await self.message.edit_text(text, **kwargs)
+        except BadRequest as e:
+            # Raised when the text is unchanged; anything else is real
+            if 'not modified' not in str(e).lower():
+                raise
+        self._shown = text
+        self.edits += 1
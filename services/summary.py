@@ -0,0 +1,164 @@
+import asyncio
+from datetime import datetime, time, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, Iterator, List, Optional
+
+from models.digest import DailyDigest
+from models.todo import Todo
+from models.repository import run_in_db, run_write
+from services.llm import acomplete, astream, count_tokens, truncate_tokens
+from services.providers import LLMProvider
+
+# Awaited with the text received so far while a response streams in
+OnText = Callable[[str], Awaitable[None]]
+
+# Default number of tokens of task text sent in one model call
+TOKEN_BUDGET = 3000
+# Default number of model calls one summary has in flight at once
+MODEL_CONCURRENCY = 4
+
+DIGEST_PROMPT = """
+You are a personal assistant.
+Condense the tasks I completed on one day into a few short bullet points.
+Keep every tag mentioned in the tasks exactly as written.
+"""
+
+CONDENSE_PROMPT = """
+You are a personal assistant.
+Condense these notes about tasks I completed into a few short bullet points.
+Keep every tag mentioned in the notes exactly as written.
+"""
+
+SUMMARY_PROMPT = """
+                    You are a personal assistant. 
+                    tell me a brief summary of my accomplishments based on my completed tasks. 
+                    Do not modify the tags mentioned in the tasks list. Make it short and concise.
+                    Split the summary into 2 paragraphs: professional and personal.
+                    """
+
+def day_range(days: int, today=None):
+    """First and last day (YYYY-MM-DD, UTC like created_at) of the last `days` days."""
+    today = today or datetime.now(timezone.utc).date()
+    days = max(1, days)
+    return (today - timedelta(days=days - 1)).isoformat(), today.isoformat()
+
+def chunk_by_tokens(items: Iterable[str], budget: int) -> Iterator[List[str]]:
+    """Group items into consecutive chunks of at most `budget` tokens.
+
+    Items are capped at half the budget, so every chunk holds at least two
+    of them and each map-reduce round shrinks the input.
+    """
+    chunk, used = [], 0
+    for item in items:
+        item = truncate_tokens(item, budget // 2)
+        tokens = count_tokens(item)
+        if chunk and used + tokens > budget:
+            yield chunk
+            chunk, used = [], 0
+        chunk.append(item)
+        used += tokens
+    if chunk:
+        yield chunk
+
+async def _ask(provider: LLMProvider, system_prompt: str, content: str, use_cache: bool,
+               limit: asyncio.Semaphore, on_text: Optional[OnText] = None) -> str:
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": content},
+    ]
+    async with limit:
+        if on_text is None:
+            return await acomplete(provider, messages, use_cache=use_cache)
+
+        text = ""
+        async for delta in astream(provider, messages, use_cache=use_cache):
+            text += delta
+            await on_text(text)
+        return text
+
+async def map_reduce(provider: LLMProvider, system_prompt: str, header: str, items: Iterable[str],
+                     budget: int, use_cache: bool, separator: str = "\n",
+                     on_text: Optional[OnText] = None, limit: Optional[asyncio.Semaphore] = None) -> str:
+    """Answer system_prompt over items, staying within budget tokens per call.
+
+    Items are chunked on the database executor, since they may be streamed
+    from the database. If they fit one call they are sent as is; otherwise
+    the chunks are condensed concurrently and the condensed notes go through
+    the same process until they fit. on_text, if given, is awaited with the
+    final answer so far as it streams in. limit bounds the model calls in
+    flight, MODEL_CONCURRENCY by default.
+    """
+    limit = limit or asyncio.Semaphore(MODEL_CONCURRENCY)
+    while True:
+        chunks = await run_in_db(list, chunk_by_tokens(items, budget))
+        if len(chunks) <= 1:
+            content = header + separator.join(chunks[0] if chunks else [])
+            return await _ask(provider, system_prompt, content, use_cache, limit, on_text)
+
+        items = await asyncio.gather(*(_ask(provider, CONDENSE_PROMPT, separator.join(chunk), use_cache, limit)
+                                       for chunk in chunks))
+        separator = "\n\n"
+
+async def _day_digest(provider: LLMProvider, user_id: int, day: str, budget: int, use_cache: bool,
+                      limit: asyncio.Semaphore) -> str:
+    """Summarize one day's completed tasks with the model."""
+    start = datetime.combine(datetime.fromisoformat(day).date(), time.min)
+    end = datetime.combine(start.date(), time.max).replace(microsecond=0)
+    tasks = Todo.iter_tasks_completed_in_range(user_id, start, end)
+    return await map_reduce(
+        provider,
+        DIGEST_PROMPT,
+        f"Tasks completed on {day}:\n",
+        (f"- {task}" for _, task, _ in tasks),
+        budget,
+        use_cache,
+        limit=limit,
+    )
+
+async def summarize_done(provider: LLMProvider, user_id: int, days: int = 7, use_cache: bool = True,
+                         token_budget: int = TOKEN_BUDGET, on_text: Optional[OnText] = None,
+                         concurrency: int = MODEL_CONCURRENCY) -> Dict:
+    """Summarize a user's completed tasks over the last `days` days.
+
+    Each day is condensed once into a stored DailyDigest; later calls reuse
+    it unless the day's set of completed tasks or the model changed, so the
+    final prompt combines at most `days` short digests instead of every task
+    in the window. Missing digests are generated concurrently, with at most
+    `concurrency` model calls in flight. No model call is sent more than
+    token_budget tokens of tasks or digests. on_text, if given, is awaited
+    with the summary so far while it streams in.
+    """
+    start_day, end_day = day_range(days)
+    days_done = await run_in_db(Todo.fingerprint_done_by_day, user_id, start_day, end_day)
+    if not days_done:
+        return {'summary': None, 'total_tasks': 0, 'days_summarized': 0}
+
+    # A digest written by another model is regenerated too
+    fingerprints = {day: f"{provider.model}:{fingerprint}" for day, (_, fingerprint) in days_done.items()}
+    stored = await run_in_db(DailyDigest.get_range, user_id, start_day, end_day)
+    stale = [day for day in sorted(days_done)
+             if not use_cache or day not in stored or stored[day][2] != fingerprints[day]]
+
+    limit = asyncio.Semaphore(concurrency)
+    generated = await asyncio.gather(*(_day_digest(provider, user_id, day, token_budget, use_cache, limit)
+                                       for day in stale))
+    for day, digest in zip(stale, generated):
+        await run_write(DailyDigest.save, user_id, day, digest, days_done[day][0], fingerprints[day])
+        stored[day] = (digest, days_done[day][0], fingerprints[day])
+    digests = {day: stored[day][0] for day in sorted(days_done)}
+
+    summary = await map_reduce(
+        provider,
+        SUMMARY_PROMPT,
+        f"Here are daily digests of the tasks I completed in the past {days} days:\n",
+        (f"{day}:\n{digest}" for day, digest in digests.items()),
+        token_budget,
+        use_cache,
+        separator="\n\n",
+        on_text=on_text,
+        limit=limit,
+    )
+    return {
+        'summary': summary,
+        'total_tasks': sum(task_count for task_count, _ in days_done.values()),
+        'days_summarized': len(digests),
+    }
@@ -0,0 +1,47 @@
+"""Concurrent update handling that keeps each user's updates in order."""
+import asyncio
+from typing import Any, Awaitable, Dict
+
+from telegram.ext import BaseUpdateProcessor
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Handles updates from different users concurrently, but one user's updates one at a time.
+
+    ConversationHandler and per-user state such as user_data assume a user's
+    updates are handled in order, so each user has a lock that their updates
+    take, in arrival order, before counting towards max_concurrent_updates.
+    Updates without a user are not serialized.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._pending: Dict[int, int] = {}  # user_id -> updates holding or waiting for the lock
+
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        user = getattr(update, 'effective_user', None)
+        if user is None:
+            await super().process_update(update, coroutine)
+            return
+
+        lock = self._locks.setdefault(user.id, asyncio.Lock())
+        self._pending[user.id] = self._pending.get(user.id, 0) + 1
+        try:
+            # Waiting here rather than inside the semaphore keeps a busy user
+            # from tying up slots other users could run in
+            async with lock:
+                await super().process_update(update, coroutine)
+        finally:
+            self._pending[user.id] -= 1
+            if not self._pending[user.id]:
+                del self._pending[user.id]
+                del self._locks[user.id]
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
@@ -0,0 +1,139 @@
+"""Event-loop watchdog.
+
+A heartbeat task measures how late the asyncio loop runs its timers, and a
+monitor thread notices when the heartbeat stops. While the loop is still
+blocked, the monitor takes the loop thread's stack and names the handler,
+job or route that was running: the outermost frame of our own code on the
+blocked stack.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional, Tuple
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Frames that only wrap a handler or job, and are skipped when naming it
+WRAPPER_FILES = {os.path.abspath(metrics.__file__), os.path.abspath(__file__)}
+STACK_DEPTH = 25  # Innermost frames kept in a stall report
+
+class Stall:
+    def __init__(self, source: str, location: str, seconds: float, stack: str):
+        self.source = source      # Handler, job or route running when the loop blocked
+        self.location = location  # file:line of the innermost frame of our own code
+        self.seconds = seconds    # How long the loop had been blocked when the stack was taken
+        self.stack = stack
+
+    def __str__(self):
+        return f"Event loop blocked for {self.seconds * 1000:.0f}ms in {self.source} at {self.location}"
+
+def _is_ours(filename: str) -> bool:
+    path = os.path.abspath(filename)
+    return path.startswith(PROJECT_ROOT + os.sep) and 'site-packages' not in path
+
+def blame(frame) -> Tuple[str, str]:
+    """(source, location) of a blocked stack.
+
+    Walking outward from the blocking call, the first unbroken run of our own
+    frames goes from `location`, where our code made the call, to `source`,
+    the handler or job the framework called into.
+    """
+    source = location = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if os.path.abspath(filename) in WRAPPER_FILES:
+            pass
+        elif _is_ours(filename):
+            if location is None:
+                location = f"{os.path.relpath(filename, PROJECT_ROOT)}:{frame.f_lineno}"
+            source = frame.f_code.co_name
+        elif source is not None:
+            break
+        frame = frame.f_back
+    return source or 'unknown', location or 'unknown'
+
+class LoopWatchdog:
+    """Measures event-loop lag and reports stalls with the stack that caused them.
+
+    start() is called on the loop to watch; stop() before that loop closes.
+    A stall is reported once, as soon as the loop has been blocked for
+    `threshold` seconds, while the blocking code is still on the stack.
+    """
+
+    def __init__(self, threshold: float = 0.1, interval: float = 0.05, max_stalls: int = 100):
+        self.threshold = threshold
+        self.interval = interval
+        self.stalls = deque(maxlen=max_stalls)  # Most recent Stall reports
+        self.max_lag = 0.0
+        self._last_beat = 0.0
+        self._loop_thread_id = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start watching the running event loop."""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._monitor, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._thread.join()
+        self._task = self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self._last_beat = now
+            lag = max(0.0, now - start - self.interval)
+            self.max_lag = max(self.max_lag, lag)
+            metrics.LOOP_LAG_SECONDS.observe(lag)
+
+    def _monitor(self):
+        reported = None  # Heartbeat whose stall was already reported
+        while not self._stopped.wait(self.interval / 2):
+            beat = self._last_beat
+            blocked = time.perf_counter() - beat - self.interval
+            if blocked < self.threshold or beat == reported:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            # The loop may have caught up while the stack was taken
+            if frame is None or self._last_beat != beat:
+                continue
+            reported = beat
+            self._report(frame, blocked)
+
+    def _report(self, frame, blocked: float):
+        source, location = blame(frame)
+        stall = Stall(source, location, blocked, ''.join(traceback.format_stack(frame)[-STACK_DEPTH:]))
+        self.stalls.append(stall)
+        metrics.LOOP_STALLS.labels(source).inc()
+        logger.warning(f"{stall}\n{stall.stack}")
+
+def watchdog_from_env() -> Optional[LoopWatchdog]:
+    """LoopWatchdog reporting stalls over LOOP_STALL_MS (0 turns it off)."""
+    threshold_ms = float(os.getenv('LOOP_STALL_MS', '100'))
+    if threshold_ms <= 0:
+        return None
+    return LoopWatchdog(threshold_ms / 1000)